@@ -0,0 +1,126 @@
+import asyncio
+import os
+
+import backoff
+import httpx
+
+import main
+from main import SP_URL, BACKEND_URL, BACKEND_HEADERS, MAX_RETRIES
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))  # Keep-alive connections per host
+RETRY_MAX_TIME = float(os.getenv("RETRY_MAX_TIME", "30"))  # Give up retrying a request after this many seconds
+
+TIMEOUT = httpx.Timeout(20.0, connect=10.0)
+LIMITS = httpx.Limits(max_connections=POOL_CONNECTIONS, max_keepalive_connections=POOL_CONNECTIONS)
+
+
+def is_client_error(error):
+    """Don't retry requests the server rejected as invalid"""
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code < 500
+
+
+# Retry transient failures with exponential backoff and full jitter so several
+# clients recovering from the same outage don't retry in lockstep
+retry = backoff.on_exception(
+    backoff.expo,
+    (httpx.TransportError, httpx.HTTPStatusError),
+    max_tries=MAX_RETRIES,
+    max_time=RETRY_MAX_TIME,
+    jitter=backoff.full_jitter,
+    giveup=is_client_error,
+)
+
+
+@retry
+async def fetch_page(screenpipe, offset):
+    """Fetch one page of frames newer than the fetch mark from ScreenPipe"""
+    response = await screenpipe.get(main.screenpipe_search_url(offset=offset))
+    response.raise_for_status()
+    return response.json().get("data") or []
+
+
+async def fetch_frames(screenpipe):
+    """Fetch every frame since the fetch mark, paging through a backlog, as pending batches"""
+    generation = main.generation
+    items = []
+    while True:
+        page = await fetch_page(screenpipe, len(items))
+        items.extend(page)
+        if not main.has_more_pages(page):
+            break
+    # A post failed while paging: these pages started past the rewound mark
+    if main.generation != generation:
+        return []
+    return main.frames_from_search(items)
+
+
+@retry
+async def post_frames(backend, payload):
+    """Send a batch of frames to the backend"""
+    response = await backend.post(f"{BACKEND_URL}/process_screen_batch", json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_loop(screenpipe, queue):
+    """Fetch a batch on the adaptive schedule and hand it to the poster"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        try:
+            for batch in await fetch_frames(screenpipe):
+                # Waits only if the previous batch is still being posted
+                await queue.put(batch)
+        except httpx.HTTPError as e:
+            print(f"❌ Error fetching ScreenPipe data: {e}")
+            main.scheduler.on_error()
+
+        # The next fetch runs while the backend is still handling this batch
+        await asyncio.sleep(max(0.0, main.scheduler.next_interval() - (loop.time() - started)))
+
+
+async def post_loop(backend, queue):
+    """
+    Post each fetched batch to the backend as soon as it arrives. Batches are
+    committed in order, and a failed post rewinds the fetch mark so its frames
+    (and any batch fetched behind it) are fetched and sent again.
+    """
+    while True:
+        batch = await queue.get()
+        try:
+            if not main.is_current(batch):
+                continue
+            if not batch["frames"]:
+                # Only duplicates: nothing to send, but they are handled
+                main.commit_batch(batch)
+                continue
+            print(f"📤 Posting {len(batch['frames'])} OCR frame(s) to backend")
+            result = await post_frames(backend, main.batch_payload(batch))
+            print("✅ Request posted successfully!")
+            main.commit_batch(batch)
+            main.handle_backend_response(result)
+        except httpx.HTTPError as e:
+            print(f"❌ Error posting to backend: {e}")
+            main.rewind()
+            main.scheduler.on_error()
+        finally:
+            queue.task_done()
+
+
+async def run():
+    """Run the fetch and post stages concurrently over pooled keep-alive connections"""
+    print("🚀 Starting ScreenBreak client (async mode)...")
+    print(f"📡 Connecting to ScreenPipe at {SP_URL}")
+    print(f"📡 Connecting to ScreenBreak server at {BACKEND_URL}")
+
+    queue = asyncio.Queue(maxsize=1)
+    async with httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS) as screenpipe, \
+            httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS, headers=BACKEND_HEADERS) as backend:
+        await asyncio.gather(fetch_loop(screenpipe, queue), post_loop(backend, queue))
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("👋 Stopping ScreenBreak client")
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import re
+import time
+from collections import deque
+
+SIMHASH_THRESHOLD = int(os.getenv("SIMHASH_THRESHOLD", "3"))  # Max differing bits to count as "the same screen"
+DEDUP_WINDOW = int(os.getenv("DEDUP_WINDOW", "32"))  # How many recent fingerprints to remember
+# Seconds after which an unchanged screen is sent again. Keep it well under the
+# server's SESSION_IDLE_GAP so a static or looping reel still keeps its session open
+DEDUP_MAX_AGE = float(os.getenv("DEDUP_MAX_AGE", "60"))
+
+TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def simhash(text):
+    """64-bit SimHash of the words in text; near-identical texts get nearby hashes"""
+    # Digits are dropped so changing like/view counters don't change the fingerprint
+    tokens = TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return 0
+
+    weights = [0] * 64
+    for token in tokens:
+        token_hash = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if token_hash >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class FrameDeduplicator:
+    """
+    Remembers fingerprints of recently sent OCR texts and rejects near-duplicates.
+    Fingerprints of a batch that hasn't reached the backend yet are pending: they
+    only become part of the remembered window once the batch is committed.
+    Remembered fingerprints expire after max_age seconds, so a screen that stays
+    the same is still sent now and then and the backend knows it is on screen.
+    """
+
+    def __init__(self, threshold=SIMHASH_THRESHOLD, window=DEDUP_WINDOW, max_age=DEDUP_MAX_AGE):
+        self.threshold = threshold
+        self.max_age = max_age
+        # (fingerprint, sent at) pairs, oldest first
+        self.recent = deque(maxlen=window)
+        self.pending = []
+        self.skipped = 0
+
+    def is_new(self, text):
+        """Return True (and hold the text as pending) if it differs from everything recently seen"""
+        fingerprint = simhash(text)
+        cutoff = time.monotonic() - self.max_age
+        while self.recent and self.recent[0][1] < cutoff:
+            self.recent.popleft()
+        for previous in [previous for previous, _ in self.recent] + self.pending:
+            if hamming_distance(fingerprint, previous) <= self.threshold:
+                self.skipped += 1
+                return False
+        self.pending.append(fingerprint)
+        return True
+
+    def commit(self, count):
+        """Remember the oldest count pending fingerprints: their batch was accepted"""
+        now = time.monotonic()
+        self.recent.extend((fingerprint, now) for fingerprint in self.pending[:count])
+        del self.pending[:count]
+
+    def rollback(self):
+        """Forget every pending fingerprint: their batches will be fetched again"""
+        self.pending.clear()
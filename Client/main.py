@@ -3,47 +3,197 @@ import time
 import json
 import datetime
 import os
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+from frame_filter import FrameDeduplicator
+from scheduler import AdaptiveScheduler
+
 SP_URL = os.getenv("SCREENPIPE_URL", "http://localhost:3030")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
-INTERVAL = int(os.getenv("CHECK_INTERVAL", "15"))  # Check every 15 seconds by default
+FETCH_LIMIT = int(os.getenv("FETCH_LIMIT", "50"))  # Max new OCR items (windows x monitors x frames) to pull per check
+FIRST_FETCH_LIMIT = int(os.getenv("FIRST_FETCH_LIMIT", "5"))  # Items on the first check: the latest capture of every window
+MAX_BATCH_FRAMES = int(os.getenv("MAX_BATCH_FRAMES", "50"))  # Frames per POST; a larger backlog is sent in several batches
+TENANT_ID = os.getenv("TENANT_ID", "")  # User/device id sent to a shared backend; empty for the default tenant
+BACKEND_HEADERS = {"X-Tenant-ID": TENANT_ID} if TENANT_ID else {}
 MAX_RETRIES = 3
 
+# Reuse keep-alive connections to ScreenPipe and the backend across checks
+session = requests.Session()
+
+# High-water mark of the newest frame the backend has accepted: (timestamp, frame_id)
+last_seen = None
+# Newest frame fetched so far, ahead of last_seen while a batch is being posted
+fetched_until = None
+# Bumped on every rewind; batches fetched before it are stale and never posted
+generation = 0
+deduplicator = FrameDeduplicator()
+scheduler = AdaptiveScheduler()
+
+def frame_position(item):
+    """Sort key for a ScreenPipe OCR item"""
+    content = item.get("content", {})
+    return (content.get("timestamp", ""), content.get("frame_id") or 0)
+
+def select_new_frames(items):
+    """
+    Keep only frames newer than the fetch mark whose text isn't a near-duplicate
+    of something already sent, and split them into pending batches of at most
+    MAX_BATCH_FRAMES frames, oldest first. Returns an empty list if nothing new
+    was captured. The high-water mark and the dedup window only move as each
+    batch is committed, so a backlog is worked off one accepted batch at a time.
+    """
+    global fetched_until
+    # Pages of a newest-first search overlap when frames are captured in between
+    items = sorted({frame_position(item): item for item in items}.values(), key=frame_position)
+    if fetched_until is not None:
+        items = [item for item in items if frame_position(item) > fetched_until]
+    if not items:
+        return []
+
+    batches = []
+    frames = []
+    for item in items:
+        content = item.get("content", {})
+        text = content.get("text", "").strip()
+        if text and deduplicator.is_new(text):
+            frame = {"text": text, "timestamp": content.get("timestamp")}
+            # Window metadata lets the server attribute usage to the foreground window
+            for field in ("app_name", "window_name", "focused"):
+                if content.get(field) is not None:
+                    frame[field] = content[field]
+            frames.append(frame)
+        if len(frames) >= MAX_BATCH_FRAMES:
+            batches.append({"frames": frames, "position": frame_position(item), "generation": generation})
+            frames = []
+
+    fetched_until = frame_position(items[-1])
+    if frames or not batches or batches[-1]["position"] != fetched_until:
+        batches.append({"frames": frames, "position": fetched_until, "generation": generation})
+    return batches
+
+def batch_payload(batch):
+    """The part of a pending batch that is posted to the backend"""
+    return {"frames": batch["frames"]}
+
+def is_current(batch):
+    """False for batches fetched before a rewind; they will be fetched again"""
+    return batch["generation"] == generation
+
+def commit_batch(batch):
+    """The backend accepted a batch (or it had nothing to send): advance the mark and remember its texts"""
+    global last_seen
+    last_seen = batch["position"]
+    deduplicator.commit(len(batch["frames"]))
+
+def rewind():
+    """A post failed: fetch everything after the last accepted batch again on the next check"""
+    global fetched_until, generation
+    fetched_until = last_seen
+    generation += 1
+    deduplicator.rollback()
+
+def search_limit():
+    """Page size for the next ScreenPipe search"""
+    # On the first check only take the latest capture rather than backfilling history
+    return FETCH_LIMIT if fetched_until else FIRST_FETCH_LIMIT
+
+def screenpipe_search_url(offset=0):
+    """ScreenPipe /search URL for a page of frames newer than the fetch mark"""
+    url = f"{SP_URL}/search?limit={search_limit()}&offset={offset}&content_type=ocr"
+    if fetched_until and fetched_until[0]:
+        url += f"&start_time={quote(fetched_until[0])}"
+    return url
+
+def has_more_pages(page):
+    """Whether a full page may be followed by more frames since the fetch mark"""
+    # The first check never backfills, so its single page is all we want
+    return fetched_until is not None and len(page) >= FETCH_LIMIT
+
+def frames_from_search(items):
+    """Turn ScreenPipe OCR items into pending batches, oldest first"""
+    if not items:
+        print("⚠️ No OCR data found. Skipping this cycle.")
+        scheduler.on_unchanged()
+        return []
+
+    batches = select_new_frames(items)
+    if not any(batch["frames"] for batch in batches):
+        print(f"⏭️ No new or changed frames ({deduplicator.skipped} duplicates skipped so far).")
+        scheduler.on_unchanged()
+    return batches
+
+def handle_backend_response(result):
+    """Show any intervention the backend asked for and adapt the check interval"""
+    scheduler.on_response(result)
+    # Check if we need to show an intervention
+    if result.get("intervention_required", False):
+        intervention_data = result.get("intervention_data", {})
+        print(f"⚠️ Intervention required! Type: {intervention_data.get('type')}")
+        
+        # Display notification or intervention depending on the type
+        if intervention_data.get("type") == "notification":
+            # In a full implementation, this would trigger a system notification
+            print(f"📢 NOTIFICATION: {intervention_data.get('message')}")
+        elif intervention_data.get("type") == "overlay":
+            # In a full implementation, this would display an overlay
+            print(f"🛑 OVERLAY: {intervention_data.get('message')}")
+
+def fetch_search_items():
+    """Every OCR item since the fetch mark, paging through a backlog until it is exhausted"""
+    items = []
+    while True:
+        response = session.get(screenpipe_search_url(offset=len(items)), timeout=(10, 20))
+        response.raise_for_status()
+        page = response.json().get("data") or []
+        items.extend(page)
+        if not has_more_pages(page):
+            return items
+
 def get_screenpipe_activity():
-    """Get latest OCR info from ScreenPipe"""
-    print("🔍 Fetching latest OCR data from ScreenPipe...")
+    """Get OCR frames captured since the last check from ScreenPipe as pending batches"""
+    print("🔍 Fetching new OCR data from ScreenPipe...")
     retries = 0
 
     while retries < MAX_RETRIES:
         try:
-            response = requests.get(
-                f"{SP_URL}/search?limit=1&offset=0&content_type=ocr", timeout=(10, 20)
-            )
-            response.raise_for_status()
+            items = fetch_search_items()
             print("✅ OCR data fetched successfully!")
-            data = response.json()
-
-            if not data.get("data"):
-                print("⚠️ No OCR data found. Skipping this cycle.")
-                return None
-            
-            # Add timestamp for tracking purposes
-            data["timestamp"] = datetime.datetime.now().isoformat()
-            return data
+            return frames_from_search(items)
 
         except requests.exceptions.Timeout:
             print(f"⚠️ Request timed out. Retrying ({retries+1}/{MAX_RETRIES})...")
             retries += 1
         except requests.exceptions.RequestException as e:
             print(f"❌ Error fetching ScreenPipe data: {e}")
-            return None
+            scheduler.on_error()
+            return []
     
     print("❌ Max retries reached. Skipping this cycle.")
-    return None
+    scheduler.on_error()
+    return []
+
+def post_batch(batch):
+    """Send a batch to the backend; only an accepted batch moves the high-water mark"""
+    print(f"📤 Posting {len(batch['frames'])} OCR frame(s) to backend")
+    try:
+        response = session.post(f"{BACKEND_URL}/process_screen_batch", json=batch_payload(batch), headers=BACKEND_HEADERS, timeout=(10, 20))
+        response.raise_for_status()
+        print(f"✅ Request posted successfully! Response: {response.status_code}")
+        commit_batch(batch)
+        handle_backend_response(response.json())
+        
+    except requests.exceptions.Timeout:
+        print("⚠️ Backend request timed out. Will resend these frames next cycle.")
+        rewind()
+        scheduler.on_error()
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error posting to backend: {e}")
+        rewind()
+        scheduler.on_error()
 
 def main():
     """Run OCR processing on an interval"""
@@ -52,38 +202,19 @@ def main():
     print(f"📡 Connecting to ScreenBreak server at {BACKEND_URL}")
     
     while True:
-        ocr_data = get_screenpipe_activity()
-        if not ocr_data:
-            print(f"⏳ Snoozing for {INTERVAL} seconds before next check...")
-            time.sleep(INTERVAL)
-            continue
-
-        print(f"📤 Posting OCR data to backend")
-        try:
-            response = requests.post(f"{BACKEND_URL}/process_screen", json=ocr_data, timeout=(10, 20))
-            response.raise_for_status()
-            print(f"✅ Request posted successfully! Response: {response.status_code}")
-            
-            # Check if we need to show an intervention
-            if response.json().get("intervention_required", False):
-                intervention_data = response.json().get("intervention_data", {})
-                print(f"⚠️ Intervention required! Type: {intervention_data.get('type')}")
-                
-                # Display notification or intervention depending on the type
-                if intervention_data.get("type") == "notification":
-                    # In a full implementation, this would trigger a system notification
-                    print(f"📢 NOTIFICATION: {intervention_data.get('message')}")
-                elif intervention_data.get("type") == "overlay":
-                    # In a full implementation, this would display an overlay
-                    print(f"🛑 OVERLAY: {intervention_data.get('message')}")
-            
-        except requests.exceptions.Timeout:
-            print("⚠️ Backend request timed out. Skipping this cycle.")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error posting to backend: {e}")
+        for batch in get_screenpipe_activity():
+            if not is_current(batch):
+                # A post failed: the rest of the backlog is fetched again next cycle
+                break
+            if batch["frames"]:
+                post_batch(batch)
+            else:
+                # Only duplicates: nothing to send, but they are handled
+                commit_batch(batch)
 
-        print(f"⏳ Snoozing for {INTERVAL} seconds before next check...")
-        time.sleep(INTERVAL)
+        interval = scheduler.next_interval()
+        print(f"⏳ Snoozing for {interval:.0f} seconds before next check...")
+        time.sleep(interval)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
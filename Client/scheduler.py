@@ -0,0 +1,65 @@
+import os
+
+CHECK_INTERVAL = float(os.getenv("CHECK_INTERVAL", "15"))  # Interval while a platform is on screen
+MIN_INTERVAL = float(os.getenv("MIN_INTERVAL", "5"))  # Fastest sampling, used right before a limit
+IDLE_INTERVAL = float(os.getenv("IDLE_INTERVAL", "60"))  # Slowest sampling when nothing is detected
+MAX_INTERVAL = float(os.getenv("MAX_INTERVAL", "300"))  # Upper bound while backing off from errors
+IDLE_BACKOFF = float(os.getenv("IDLE_BACKOFF", "1.5"))  # Growth per idle or unchanged check
+ERROR_BACKOFF = float(os.getenv("ERROR_BACKOFF", "2"))  # Growth per consecutive error
+LIMIT_CHECKS = float(os.getenv("LIMIT_CHECKS", "8"))  # Checks to spread over the time left before a limit
+
+
+class AdaptiveScheduler:
+    """
+    Picks the wait before the next check from what the last check saw:
+    slow down while idle or static, speed up as a usage limit approaches,
+    and back off exponentially while ScreenPipe or the backend is failing.
+    """
+
+    def __init__(self):
+        self.interval = CHECK_INTERVAL
+        self.active = False
+        self.errors = 0
+
+    def _clamp(self, seconds, upper):
+        return max(MIN_INTERVAL, min(seconds, upper))
+
+    def on_response(self, result):
+        """Adjust to the backend's answer for the last batch"""
+        self.errors = 0
+        platform = result.get("platform", "none")
+        if platform == "none":
+            self.active = False
+            self.interval = self._clamp(self.interval * IDLE_BACKOFF, IDLE_INTERVAL)
+            return
+
+        self.active = True
+        usage = result.get("usage_stats") or result.get("intervention_data", {}).get("usage_stats", {})
+        remaining = min(
+            usage.get("session_goal_minutes", 15) - usage.get("current_session_minutes", 0),
+            usage.get("daily_goal_minutes", 60) - usage.get("today_minutes", 0)
+        )
+        if remaining <= 0:
+            # Already over a limit: keep checking at the normal pace
+            self.interval = CHECK_INTERVAL
+        else:
+            # Spread several checks over the time left, so sampling tightens as the limit nears
+            self.interval = self._clamp(remaining * 60 / LIMIT_CHECKS, IDLE_INTERVAL)
+
+    def on_unchanged(self):
+        """Nothing new on screen since the last check"""
+        if self.errors:
+            # ScreenPipe answered again, so drop the error backoff
+            self.errors = 0
+            self.interval = CHECK_INTERVAL
+        # During a detected session time still counts towards the limits, so keep pace
+        if not self.active:
+            self.interval = self._clamp(self.interval * IDLE_BACKOFF, IDLE_INTERVAL)
+
+    def on_error(self):
+        """ScreenPipe or the backend failed"""
+        self.errors += 1
+        self.interval = self._clamp(CHECK_INTERVAL * ERROR_BACKOFF ** self.errors, MAX_INTERVAL)
+
+    def next_interval(self):
+        return self.interval
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rolling window the error and slow-call rates are computed over
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+# Calls needed in the window before the rates are trusted
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+# Calls slower than this count as slow; the circuit also opens when too many are
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "2.5"))
+CIRCUIT_SLOW_RATE = float(os.getenv("CIRCUIT_SLOW_RATE", "0.5"))
+# Seconds the circuit stays open before a background probe checks for recovery
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency once too many recent calls failed or were slow.
+    While open every call is rejected immediately; CIRCUIT_OPEN_SECONDS after it
+    opened a timer starts a single background probe (half open) that closes the
+    circuit if it succeeds quickly, so recovery needs no traffic and no user
+    request pays for finding out.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.probe = probe
+        self.state = CLOSED
+        self.transitions = {state: 0 for state in STATES}
+        # (finished at, failed, slow) per call in the rolling window
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; starts a recovery probe once the open period is over"""
+        if self.state == CLOSED:
+            return True
+        # The timer scheduled on opening normally starts the probe; this covers a missed one
+        if self.state == OPEN and time.monotonic() - self._opened_at >= CIRCUIT_OPEN_SECONDS:
+            self._start_probe()
+        return False
+
+    def record(self, failed: bool, seconds: float) -> None:
+        """Add a finished call to the window and open the circuit if the rates are too high"""
+        now = time.monotonic()
+        self._calls.append((now, failed, seconds >= CIRCUIT_SLOW_CALL_SECONDS))
+        while self._calls and self._calls[0][0] < now - CIRCUIT_WINDOW_SECONDS:
+            self._calls.popleft()
+
+        if self.state != CLOSED or len(self._calls) < CIRCUIT_MIN_CALLS:
+            return
+        error_rate = sum(call[1] for call in self._calls) / len(self._calls)
+        slow_rate = sum(call[2] for call in self._calls) / len(self._calls)
+        if error_rate >= CIRCUIT_ERROR_RATE or slow_rate >= CIRCUIT_SLOW_RATE:
+            logger.warning(
+                f"⚡ {self.name} circuit opened (errors {error_rate:.0%}, slow {slow_rate:.0%} "
+                f"over {len(self._calls)} calls)"
+            )
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+        # Probe on a timer, so the circuit recovers even if no request comes in
+        try:
+            asyncio.get_running_loop().call_later(CIRCUIT_OPEN_SECONDS, self._start_probe)
+        except RuntimeError:
+            pass
+
+    def _start_probe(self) -> None:
+        """Go half open and run the recovery probe, unless another probe already started"""
+        if self.state != OPEN or time.monotonic() - self._opened_at < CIRCUIT_OPEN_SECONDS:
+            return
+        self._transition(HALF_OPEN)
+        self._probe_task = asyncio.create_task(self._run_probe())
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self.transitions[state] += 1
+
+    async def _run_probe(self) -> None:
+        started = time.monotonic()
+        try:
+            await self.probe()
+            healthy = time.monotonic() - started < CIRCUIT_SLOW_CALL_SECONDS
+        except Exception as e:
+            logger.warning(f"⚡ {self.name} recovery probe failed: {e}")
+            healthy = False
+
+        if healthy:
+            logger.info(f"✅ {self.name} circuit closed after a successful probe")
+            # Start the new closed period from a clean window
+            self._calls.clear()
+            self._transition(CLOSED)
+        else:
+            self._open()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "window_errors": sum(call[1] for call in self._calls),
+            "window_slow": sum(call[2] for call in self._calls),
+            "transitions": dict(self.transitions),
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from ocr_compaction import compact_ocr_text
+
+CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "2048"))
+CACHE_TTL_SECONDS = int(os.getenv("CLASSIFICATION_CACHE_TTL", "3600"))
+# Leave empty to keep the cache in memory only
+CACHE_DB_PATH = os.getenv("CLASSIFICATION_CACHE_DB", "")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def normalize_ocr_text(ocr_text: str) -> str:
+    """
+    Normalize OCR text so consecutive frames of the same feed map to the same key.
+    Like/view counters and timestamps change every frame, so digit runs are collapsed.
+    """
+    text = ocr_text.lower()
+    text = _DIGITS_RE.sub("0", text)
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip()
+
+
+def cache_key(ocr_text: str) -> str:
+    """
+    Content-addressed key for a piece of OCR text. Hashes the compacted text the
+    LLM actually sees, so frames that differ only in dropped noise share a key.
+    """
+    return compact_cache_key(compact_ocr_text(ocr_text))
+
+
+def compact_cache_key(compact_text: str) -> str:
+    """cache_key for text that has already been through compact_ocr_text"""
+    return hashlib.sha1(normalize_ocr_text(compact_text).encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    """
+    LRU + TTL cache for platform classification results.
+    Values are the raw JSON strings returned by the classifier. When a db_path
+    is given, entries are also written to SQLite so they survive restarts. Those
+    writes are batched and run in a worker thread, off the event loop.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: int = CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Disk writes not made yet: key -> (created_at, result), or None to delete the key
+        self._pending: Dict[str, Optional[Tuple[float, str]]] = {}
+        self._write_task: Optional[asyncio.Task] = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('''
+            CREATE TABLE IF NOT EXISTS classification_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            ''')
+            self._db.commit()
+            self._load_from_disk()
+
+    def _load_from_disk(self) -> None:
+        """Warm the in-memory LRU with the most recent unexpired disk entries"""
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM classification_cache WHERE created_at < ?", (cutoff,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, result, created_at FROM classification_cache ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        # Insert oldest first so the newest entries end up most recently used
+        for key, result, created_at in reversed(rows):
+            self._entries[key] = (created_at, result)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached result for a key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: str) -> None:
+        """Store a classification result, evicting the least recently used entry if full"""
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now, result)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+
+            if self._db is not None:
+                self._pending[key] = (now, result)
+                for evicted_key in evicted:
+                    self._pending[evicted_key] = None
+        if self._db is not None:
+            self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        """Write pending entries in the background, or right away outside an event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_pending()
+            return
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_in_background())
+
+    async def _write_in_background(self) -> None:
+        # Puts made while a batch is being written are picked up by the next one
+        while self._pending:
+            await asyncio.to_thread(self._write_pending)
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO classification_cache (key, result, created_at) VALUES (?, ?, ?)",
+                [(key, entry[1], entry[0]) for key, entry in pending.items() if entry is not None]
+            )
+            self._db.executemany(
+                "DELETE FROM classification_cache WHERE key = ?",
+                [(key,) for key, entry in pending.items() if entry is None]
+            )
+            self._db.commit()
+
+    async def flush(self) -> None:
+        """Write every pending entry to disk (on shutdown)"""
+        if self._db is not None:
+            await asyncio.to_thread(self._write_pending)
+
+    def clear(self) -> None:
+        """Drop every cached entry, including the on-disk copy"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM classification_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+classification_cache = ClassificationCache(db_path=CACHE_DB_PATH or None)
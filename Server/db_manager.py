@@ -1,350 +1,235 @@
-import sqlite3
-import aiosqlite
+import asyncio
+import contextvars
 import datetime
-import json
+import logging
 import os
-from typing import Dict, Any, Tuple, List, Optional
+import re
+from collections import OrderedDict
+from typing import Dict, Any, Tuple, List, Optional, Iterator
 
-# Database path
-DB_PATH = "screenbreak.db"
+from db_pool import DB_READER_CONNECTIONS
+from usage_state import OpenSession, parse_timestamp
+from usage_store import UsageStore
+from events import EventBroker
 
-async def init_db():
-    """Initialize the database with required tables"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Create sessions table to track platform usage
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            platform TEXT NOT NULL,
-            start_time TEXT NOT NULL,
-            end_time TEXT,
-            duration INTEGER DEFAULT 0
-        )
-        ''')
-        
-        # Create settings table for user preferences
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS settings (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            daily_limit_minutes INTEGER DEFAULT 60,
-            session_limit_minutes INTEGER DEFAULT 15,
-            intervention_frequency TEXT DEFAULT 'medium',
-            settings_json TEXT
-        )
-        ''')
-        
-        # Create statistics table for aggregated data
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS statistics (
-            date TEXT PRIMARY KEY,
-            total_minutes INTEGER DEFAULT 0,
-            platform_breakdown TEXT,
-            session_count INTEGER DEFAULT 0
+logger = logging.getLogger(__name__)
+
+# Database path of the default tenant (single-user installs and requests without a tenant id)
+DB_PATH = os.getenv("DB_PATH", "screenbreak.db")
+
+# Every other tenant gets its own database file in this directory
+TENANT_DB_DIR = os.getenv("TENANT_DB_DIR", "tenants")
+# Tenant databases kept open at once; the least recently used idle one is closed beyond this
+MAX_OPEN_TENANTS = int(os.getenv("MAX_OPEN_TENANTS", "32"))
+# Usage reads are answered from memory, so extra tenants only need a small reader pool
+TENANT_READER_CONNECTIONS = int(os.getenv("TENANT_READER_CONNECTIONS", "1"))
+# Sessions moved out of the live tables are kept under ARCHIVE_DIR/<tenant id>
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Tenant-ID"
+_TENANT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Open tenant stores in least-recently-used order
+_stores: "OrderedDict[str, UsageStore]" = OrderedDict()
+# Stores being opened or closed, so a tenant is never open twice at once
+_pending: Dict[str, asyncio.Task] = {}
+# Store for the request being handled; code outside a request uses the default tenant
+_current_store: contextvars.ContextVar[Optional[UsageStore]] = contextvars.ContextVar("current_store", default=None)
+
+
+class UnknownTenantError(LookupError):
+    """A read-only request for a tenant that has no database yet"""
+
+
+def is_valid_tenant_id(tenant_id: str) -> bool:
+    return bool(_TENANT_ID_RE.match(tenant_id))
+
+def tenant_db_path(tenant_id: str) -> str:
+    if tenant_id == DEFAULT_TENANT:
+        return DB_PATH
+    return os.path.join(TENANT_DB_DIR, f"{tenant_id}.db")
+
+def tenant_archive_dir(tenant_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, tenant_id)
+
+def tenant_exists(tenant_id: str) -> bool:
+    """Whether a tenant already has a database (open, being opened or on disk)"""
+    return (tenant_id == DEFAULT_TENANT or tenant_id in _stores or tenant_id in _pending
+            or os.path.exists(tenant_db_path(tenant_id)))
+
+async def _open_store(tenant_id: str) -> None:
+    try:
+        readers = DB_READER_CONNECTIONS if tenant_id == DEFAULT_TENANT else TENANT_READER_CONNECTIONS
+        store = UsageStore(tenant_id, tenant_db_path(tenant_id), readers, tenant_archive_dir(tenant_id))
+        await store.open()
+        _stores[tenant_id] = store
+        logger.info(f"🗄️ Opened database for tenant {tenant_id}")
+        _evict_idle_stores()
+    finally:
+        _pending.pop(tenant_id, None)
+
+async def _close_store(tenant_id: str, store: UsageStore) -> None:
+    try:
+        await store.close()
+    except Exception as e:
+        logger.error(f"❌ Error closing database for tenant {tenant_id}: {e}")
+    finally:
+        _pending.pop(tenant_id, None)
+
+def _evict_idle_stores() -> None:
+    """Close least recently used idle stores until at most MAX_OPEN_TENANTS are open"""
+    while len(_stores) > MAX_OPEN_TENANTS:
+        # The default tenant stays open: it serves everything outside a request
+        victim = next(
+            (tenant_id for tenant_id, store in _stores.items()
+             if store.active == 0 and tenant_id != DEFAULT_TENANT),
+            None
         )
-        ''')
-        
-        # Insert default settings if they don't exist
-        await db.execute('''
-        INSERT OR IGNORE INTO settings (id, daily_limit_minutes, session_limit_minutes, intervention_frequency)
-        VALUES (1, 60, 15, 'medium')
-        ''')
-        
-        await db.commit()
+        if victim is None:
+            # Everyone is busy; go over the limit until requests finish
+            return
+        store = _stores.pop(victim)
+        _pending[victim] = asyncio.create_task(_close_store(victim, store))
+
+async def acquire_store(tenant_id: str, create: bool = True) -> UsageStore:
+    """
+    Open (or reuse) a tenant's store and mark it in use until release_store.
+    With create=False a tenant without a database raises UnknownTenantError
+    instead of getting an empty one.
+    """
+    if not create and not tenant_exists(tenant_id):
+        raise UnknownTenantError(tenant_id)
+    while True:
+        store = _stores.get(tenant_id)
+        if store is not None:
+            _stores.move_to_end(tenant_id)
+            store.active += 1
+            return store
+        pending = _pending.get(tenant_id)
+        if pending is None:
+            pending = _pending[tenant_id] = asyncio.create_task(_open_store(tenant_id))
+        # Wait for an in-flight open (or close) to finish, then look again
+        await asyncio.shield(pending)
+
+def release_store(store: UsageStore) -> None:
+    store.active -= 1
+    _evict_idle_stores()
+
+def bind_store(store: UsageStore) -> contextvars.Token:
+    """Make a store the current one for the rest of this request"""
+    return _current_store.set(store)
+
+def unbind_store(token: contextvars.Token) -> None:
+    _current_store.reset(token)
+
+def current_store() -> UsageStore:
+    """Store of the tenant the current request belongs to"""
+    store = _current_store.get()
+    if store is None:
+        store = _stores[DEFAULT_TENANT]
+    return store
+
+def current_broker() -> EventBroker:
+    return current_store().broker
+
+def open_tenant_count() -> int:
+    return len(_stores)
+
+async def init_db():
+    """Open the default tenant's database; other tenants are opened on first use"""
+    store = await acquire_store(DEFAULT_TENANT)
+    store.active -= 1
+
+async def close_db() -> None:
+    """Flush pending usage changes and close every open tenant database"""
+    while _stores or _pending:
+        for tenant_id, store in list(_stores.items()):
+            _stores.pop(tenant_id)
+            _pending[tenant_id] = asyncio.create_task(_close_store(tenant_id, store))
+        await asyncio.gather(*list(_pending.values()), return_exceptions=True)
+
+async def reset_tenant_database() -> None:
+    """Delete the current tenant's database and start it fresh"""
+    await current_store().reset()
+
+async def load_usage_state() -> None:
+    """Rebuild the in-memory usage state from the database"""
+    await current_store().load_state()
+
+async def flush_usage_state() -> None:
+    """Write pending usage changes to SQLite in a single transaction"""
+    await current_store().flush()
+
+def reap_idle_sessions() -> List[OpenSession]:
+    """Close the current tenant's sessions that have been idle for longer than the idle gap"""
+    return current_store().reap_idle_sessions()
 
 async def record_session(platform: str, timestamp: str) -> None:
     """Record or update a platform usage session"""
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    current_time = datetime.datetime.now().isoformat()
-    
-    async with aiosqlite.connect(DB_PATH) as db:
-        # First check if there's an open session for this platform
-        cursor = await db.execute(
-            "SELECT id, start_time FROM sessions WHERE platform = ? AND end_time IS NULL", 
-            (platform,)
-        )
-        open_session = await cursor.fetchone()
-        
-        if open_session:
-            # Update existing session
-            session_id, start_time = open_session
-            start_dt = datetime.datetime.fromisoformat(start_time)
-            current_dt = datetime.datetime.now()
-            duration_minutes = int((current_dt - start_dt).total_seconds() // 60)
-            
-            # Update the session duration but keep it open
-            await db.execute(
-                "UPDATE sessions SET duration = ? WHERE id = ?",
-                (duration_minutes, session_id)
-            )
-            
-            # Also update today's statistics with the ongoing session time
-            cursor = await db.execute("SELECT platform_breakdown, total_minutes FROM statistics WHERE date = ?", (today,))
-            stats_row = await cursor.fetchone()
-            
-            if stats_row:
-                platform_breakdown, total_minutes = stats_row
-                platforms = json.loads(platform_breakdown)
-                current_platform_time = platforms.get(platform, 0)
-                
-                # Calculate time since last update
-                platforms[platform] = max(current_platform_time, duration_minutes)
-                new_total = sum(platforms.values())
-                
-                await db.execute(
-                    "UPDATE statistics SET total_minutes = ?, platform_breakdown = ? WHERE date = ?",
-                    (new_total, json.dumps(platforms), today)
-                )
-        else:
-            # Create a new session
-            await db.execute(
-                "INSERT INTO sessions (platform, start_time) VALUES (?, ?)",
-                (platform, current_time)
-            )
-            
-            # Update statistics for today
-            cursor = await db.execute("SELECT * FROM statistics WHERE date = ?", (today,))
-            stats_row = await cursor.fetchone()
-            
-            if stats_row:
-                # Update existing stats
-                await db.execute(
-                    "UPDATE statistics SET session_count = session_count + 1 WHERE date = ?",
-                    (today,)
-                )
-            else:
-                # Create new stats row for today
-                platform_breakdown = json.dumps({platform: 0})
-                await db.execute(
-                    "INSERT INTO statistics (date, total_minutes, platform_breakdown, session_count) VALUES (?, ?, ?, ?)",
-                    (today, 0, platform_breakdown, 1)
-                )
-        
-        await db.commit()
+    current_store().record_session(platform, timestamp)
+
+async def record_sessions(detections: List[Tuple[str, str]]) -> None:
+    """Record many (platform, timestamp) detections; the flusher persists them together"""
+    current_store().record_sessions(detections)
 
 async def close_session(platform: str) -> None:
     """Close an open session for a platform"""
-    current_time = datetime.datetime.now().isoformat()
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Get the open session
-        cursor = await db.execute(
-            "SELECT id, start_time, duration FROM sessions WHERE platform = ? AND end_time IS NULL", 
-            (platform,)
-        )
-        open_session = await cursor.fetchone()
-        
-        if open_session:
-            session_id, start_time, duration = open_session
-            start_dt = datetime.datetime.fromisoformat(start_time)
-            current_dt = datetime.datetime.now()
-            duration_minutes = (current_dt - start_dt).total_seconds() // 60
-            
-            # Close the session
-            await db.execute(
-                "UPDATE sessions SET end_time = ?, duration = ? WHERE id = ?",
-                (current_time, duration_minutes, session_id)
-            )
-            
-            # Update statistics
-            cursor = await db.execute("SELECT platform_breakdown, total_minutes FROM statistics WHERE date = ?", (today,))
-            stats_row = await cursor.fetchone()
-            
-            if stats_row:
-                platform_breakdown, total_minutes = stats_row
-                platforms = json.loads(platform_breakdown)
-                
-                # Update platform time
-                platforms[platform] = platforms.get(platform, 0) + duration_minutes
-                new_total = total_minutes + duration_minutes
-                
-                await db.execute(
-                    "UPDATE statistics SET total_minutes = ?, platform_breakdown = ? WHERE date = ?",
-                    (new_total, json.dumps(platforms), today)
-                )
-        
-        await db.commit()
+    current_store().close_session(platform)
 
 async def get_usage_stats(platform: Optional[str] = None) -> Dict[str, Any]:
     """Get usage statistics for today, optionally filtered by platform"""
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Get settings for goals
-        cursor = await db.execute("SELECT daily_limit_minutes, session_limit_minutes FROM settings WHERE id = 1")
-        settings = await cursor.fetchone()
-        daily_goal, session_goal = settings if settings else (60, 15)
-        
-        # Get today's statistics
-        cursor = await db.execute("SELECT total_minutes, platform_breakdown, session_count FROM statistics WHERE date = ?", (today,))
-        stats_row = await cursor.fetchone()
-        
-        if not stats_row:
-            return {
-                "today_minutes": 0,
-                "daily_goal_minutes": daily_goal,
-                "current_session_minutes": 0,
-                "session_goal_minutes": session_goal,
-                "times_opened_today": 0,
-                "platforms": {}
-            }
-        
-        total_minutes, platform_breakdown, session_count = stats_row
-        platforms = json.loads(platform_breakdown) if platform_breakdown else {}
-        
-        # Get current open session if any
-        if platform:
-            # Get specific platform session
-            cursor = await db.execute(
-                "SELECT start_time, duration FROM sessions WHERE platform = ? AND end_time IS NULL", 
-                (platform,)
-            )
-            open_session = await cursor.fetchone()
-            
-            current_session_minutes = 0
-            if open_session:
-                start_time, recorded_duration = open_session
-                start_dt = datetime.datetime.fromisoformat(start_time)
-                current_dt = datetime.datetime.now()
-                # Calculate current session minutes based on real-time data
-                current_session_minutes = int((current_dt - start_dt).total_seconds() // 60)
-                
-                # Make sure platform time reflects current session
-                current_platform_time = platforms.get(platform, 0)
-                if current_session_minutes > current_platform_time:
-                    platforms[platform] = current_session_minutes
-                    # Update in database
-                    await db.execute(
-                        "UPDATE statistics SET platform_breakdown = ? WHERE date = ?",
-                        (json.dumps(platforms), today)
-                    )
-                    await db.commit()
-        else:
-            # Check for any open session
-            cursor = await db.execute(
-                "SELECT platform, start_time, duration FROM sessions WHERE end_time IS NULL ORDER BY start_time DESC LIMIT 1"
-            )
-            open_session = await cursor.fetchone()
-            
-            current_session_minutes = 0
-            if open_session:
-                session_platform, start_time, recorded_duration = open_session
-                start_dt = datetime.datetime.fromisoformat(start_time)
-                current_dt = datetime.datetime.now()
-                current_session_minutes = int((current_dt - start_dt).total_seconds() // 60)
-                
-                # Update platform time if needed
-                current_platform_time = platforms.get(session_platform, 0)
-                if current_session_minutes > current_platform_time:
-                    platforms[session_platform] = current_session_minutes
-                    # Recalculate total
-                    total_minutes = sum(platforms.values())
-                    # Update in database
-                    await db.execute(
-                        "UPDATE statistics SET total_minutes = ?, platform_breakdown = ? WHERE date = ?",
-                        (total_minutes, json.dumps(platforms), today)
-                    )
-                    await db.commit()
-        
-        # If platform is specified, filter stats
-        if platform:
-            platform_minutes = platforms.get(platform, 0)
-            platform_sessions = await db.execute(
-                "SELECT COUNT(*) FROM sessions WHERE platform = ? AND start_time LIKE ?", 
-                (platform, f"{today}%")
-            )
-            platform_session_count = (await platform_sessions.fetchone())[0]
-            
-            return {
-                "today_minutes": platform_minutes,
-                "daily_goal_minutes": daily_goal,
-                "current_session_minutes": current_session_minutes,
-                "session_goal_minutes": session_goal,
-                "times_opened_today": platform_session_count,
-                "platform": platform
-            }
-        
-        # Return overall stats (recalculate total minutes from platforms)
-        total_minutes = sum(platforms.values())
-        
-        return {
-            "today_minutes": total_minutes,
-            "daily_goal_minutes": daily_goal,
-            "current_session_minutes": current_session_minutes,
-            "session_goal_minutes": session_goal,
-            "times_opened_today": session_count,
-            "platforms": platforms
-        }
+    return current_store().state.usage_stats(platform)
+
+async def run_retention() -> Dict[str, int]:
+    """Archive the current tenant's expired sessions now instead of waiting for the schedule"""
+    return await current_store().run_retention()
+
+def iter_archived_sessions(start: Optional[datetime.datetime] = None,
+                           end: Optional[datetime.datetime] = None,
+                           platform: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the current tenant's archived sessions"""
+    return current_store().archived_sessions(start, end, platform)
+
+async def get_usage_history(start: datetime.datetime, end: datetime.datetime,
+                            granularity: str, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Usage per hour/day/week bucket between start and end, from the rollup tables"""
+    return await current_store().usage_history(start, end, granularity, platform)
+
+def get_current_platform() -> Optional[str]:
+    """Platform of the most recently started open session, if any"""
+    session = current_store().state.current_session()
+    return session.platform if session else None
 
 async def check_intervention_needed(platform: str, usage_stats: Dict[str, Any]) -> Tuple[bool, str]:
     """Determine if an intervention is needed based on usage patterns"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Get intervention frequency setting
-        cursor = await db.execute("SELECT intervention_frequency FROM settings WHERE id = 1")
-        frequency = (await cursor.fetchone())[0]
-        
-        # Convert frequency to numerical thresholds
-        if frequency == "low":
-            session_threshold = 0.9  # 90% of limit
-            daily_threshold = 0.8    # 80% of limit
-        elif frequency == "medium":
-            session_threshold = 0.75  # 75% of limit
-            daily_threshold = 0.6     # 60% of limit
-        else:  # high
-            session_threshold = 0.5   # 50% of limit
-            daily_threshold = 0.4     # 40% of limit
-        
-        daily_limit = usage_stats.get("daily_goal_minutes", 60)
-        session_limit = usage_stats.get("session_goal_minutes", 15)
-        
-        current_daily = usage_stats.get("today_minutes", 0)
-        current_session = usage_stats.get("current_session_minutes", 0)
-        
-        # Check if we should intervene
-        if current_session >= session_limit:
-            return True, "session_limit_exceeded"
-        elif current_daily >= daily_limit:
-            return True, "daily_limit_exceeded"
-        elif current_session >= session_limit * session_threshold:
-            return True, "session_limit_approaching"
-        elif current_daily >= daily_limit * daily_threshold:
-            return True, "daily_limit_approaching"
-        
-        # Check excessive session count
-        if usage_stats.get("times_opened_today", 0) > 10:
-            return True, "frequent_opening"
-            
-        return False, ""
+    # Thresholds for the intervention frequency are precomputed in the settings snapshot
+    settings = current_store().state.settings
+    session_threshold = settings.session_threshold
+    daily_threshold = settings.daily_threshold
+
+    daily_limit = usage_stats.get("daily_goal_minutes", 60)
+    session_limit = usage_stats.get("session_goal_minutes", 15)
+
+    current_daily = usage_stats.get("today_minutes", 0)
+    current_session = usage_stats.get("current_session_minutes", 0)
+
+    # Check if we should intervene
+    if current_session >= session_limit:
+        return True, "session_limit_exceeded"
+    elif current_daily >= daily_limit:
+        return True, "daily_limit_exceeded"
+    elif current_session >= session_limit * session_threshold:
+        return True, "session_limit_approaching"
+    elif current_daily >= daily_limit * daily_threshold:
+        return True, "daily_limit_approaching"
+
+    # Check excessive session count
+    if usage_stats.get("times_opened_today", 0) > 10:
+        return True, "frequent_opening"
+
+    return False, ""
 
 async def update_user_settings(settings: Dict[str, Any]) -> None:
     """Update user preferences and settings"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Extract specific settings
-        daily_limit = settings.get("daily_limit_minutes")
-        session_limit = settings.get("session_limit_minutes")
-        frequency = settings.get("intervention_frequency")
-        
-        update_fields = []
-        update_values = []
-        
-        if daily_limit is not None:
-            update_fields.append("daily_limit_minutes = ?")
-            update_values.append(daily_limit)
-            
-        if session_limit is not None:
-            update_fields.append("session_limit_minutes = ?")
-            update_values.append(session_limit)
-            
-        if frequency is not None:
-            update_fields.append("intervention_frequency = ?")
-            update_values.append(frequency)
-        
-        # Store all settings as JSON for future extensibility
-        update_fields.append("settings_json = ?")
-        update_values.append(json.dumps(settings))
-        
-        # Update settings
-        if update_fields:
-            query = f"UPDATE settings SET {', '.join(update_fields)} WHERE id = 1"
-            await db.execute(query, update_values)
-            await db.commit()
\ No newline at end of file
+    await current_store().update_settings(settings)
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+import aiosqlite
+
+from metrics import DB_CONNECTION_WAIT_SECONDS, DB_OPERATION_SECONDS
+
+DB_READER_CONNECTIONS = int(os.getenv("DB_READER_CONNECTIONS", "4"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+
+class ConnectionPool:
+    """
+    Application-lifetime SQLite connections: one writer and N readers.
+    The database runs in WAL mode so readers never wait for the writer;
+    writes are serialized through a lock on the single writer connection.
+    """
+
+    def __init__(self, path: str, readers: int = DB_READER_CONNECTIONS):
+        self.path = path
+        self.reader_count = readers
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        self._all_readers: List[aiosqlite.Connection] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        """Open a connection with the pragmas every pooled connection shares"""
+        db = await aiosqlite.connect(self.path, cached_statements=DB_STATEMENT_CACHE_SIZE)
+        # executescript steps every statement to completion, so pragmas that
+        # return a row don't leave a statement (and its lock) pending
+        await db.executescript(f'''
+        PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS};
+        PRAGMA synchronous = NORMAL;
+        PRAGMA mmap_size = {DB_MMAP_SIZE};
+        PRAGMA temp_store = MEMORY;
+        {"PRAGMA query_only = ON;" if read_only else ""}
+        ''')
+        return db
+
+    async def open(self) -> None:
+        """Open the writer and reader connections"""
+        if self.is_open:
+            return
+        self._write_lock = asyncio.Lock()
+        self._writer = await self._connect(read_only=False)
+        # journal_mode is persistent, so setting it once on the writer is enough
+        await self._writer.executescript("PRAGMA journal_mode = WAL;")
+
+        for _ in range(self.reader_count):
+            reader = await self._connect(read_only=True)
+            self._all_readers.append(reader)
+            self._readers.put_nowait(reader)
+
+    async def close(self) -> None:
+        """Close every pooled connection"""
+        for reader in self._all_readers:
+            await reader.close()
+        self._all_readers = []
+        self._readers = asyncio.Queue()
+
+        if self._writer is not None:
+            async with self._write_lock:
+                await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def writer(self, operation: str = "other") -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Exclusive use of the writer connection; rolls back if the block raises.
+        operation labels the time spent holding the connection in /metrics.
+        """
+        started = time.perf_counter()
+        async with self._write_lock:
+            acquired = time.perf_counter()
+            DB_CONNECTION_WAIT_SECONDS.observe(acquired - started, role="writer")
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            finally:
+                DB_OPERATION_SECONDS.observe(time.perf_counter() - acquired, operation=operation)
+
+    @asynccontextmanager
+    async def reader(self, operation: str = "other") -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection for the duration of the block"""
+        started = time.perf_counter()
+        db = await self._readers.get()
+        acquired = time.perf_counter()
+        DB_CONNECTION_WAIT_SECONDS.observe(acquired - started, role="reader")
+        try:
+            yield db
+        finally:
+            DB_OPERATION_SECONDS.observe(time.perf_counter() - acquired, operation=operation)
+            self._readers.put_nowait(db)
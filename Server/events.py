@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "32"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+# A new subscriber is only sent the last intervention if it is at most this old
+EVENT_REPLAY_SECONDS = float(os.getenv("EVENT_REPLAY_SECONDS", "60"))
+
+# Events that describe current state and are always replayed; others (interventions) are moments
+SNAPSHOT_EVENTS = {"usage"}
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventBroker:
+    """
+    Fans usage and intervention updates out to connected dashboards.
+    An event is only sent when its payload differs from the last one of the
+    same type, so an idle or unchanged backend pushes nothing.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._last: Dict[str, Any] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: Dict[str, Any], dedupe_key: Optional[Any] = None) -> bool:
+        """
+        Send an event to every subscriber if it changed since the last one.
+        dedupe_key overrides what counts as "changed" (defaults to the payload).
+        Returns True if the event was sent.
+        """
+        key = data if dedupe_key is None else dedupe_key
+        if self._last.get(event, {}).get("key") == key:
+            return False
+        self._last[event] = {"key": key, "data": data, "published_at": time.monotonic()}
+
+        message = format_sse(event, data)
+        for queue in self._subscribers:
+            if queue.full():
+                # A stalled client only ever needs the newest state
+                queue.get_nowait()
+            queue.put_nowait(message)
+        return True
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Yield SSE messages for one client, starting with the latest known state.
+        A dashboard reconnecting long after an intervention doesn't get it replayed.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        now = time.monotonic()
+        for event, last in self._last.items():
+            if event in SNAPSHOT_EVENTS or now - last["published_at"] <= EVENT_REPLAY_SECONDS:
+                queue.put_nowait(format_sse(event, last["data"]))
+        self._subscribers.add(queue)
+        getter: Optional[asyncio.Task] = None
+        try:
+            while True:
+                # Keep the same pending get across heartbeats so no message is dropped
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=EVENT_HEARTBEAT_SECONDS)
+                if done:
+                    message = getter.result()
+                    getter = None
+                    yield message
+                else:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+        finally:
+            if getter is not None:
+                getter.cancel()
+            self._subscribers.discard(queue)
+
+
+# One broker per tenant. Brokers outlive the tenant's database handle, so an open
+# dashboard stream keeps receiving events after the handle is evicted and reopened.
+_brokers: Dict[str, EventBroker] = {}
+
+
+def broker_for(tenant_id: str) -> EventBroker:
+    broker = _brokers.get(tenant_id)
+    if broker is None:
+        broker = _brokers[tenant_id] = EventBroker()
+    return broker
+
+
+def subscriber_count() -> int:
+    """Connected dashboard streams across all tenants"""
+    return sum(broker.subscriber_count for broker in _brokers.values())
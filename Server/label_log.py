@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# Opt-in: when set, every LLM classification is appended here as a training label
+# for the local model. The file holds raw OCR text of the user's screen.
+LABEL_LOG_PATH = os.getenv("LABEL_LOG_PATH", "")
+# Once the log reaches this size it is rotated to <path>.1, replacing the previous one
+LABEL_LOG_MAX_BYTES = int(os.getenv("LABEL_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def rotated_path(path: str) -> str:
+    return path + ".1"
+
+
+class LabelLog:
+    """
+    Append-only JSON-lines log of (OCR text, platform, confidence) verdicts, kept
+    to at most two files of LABEL_LOG_MAX_BYTES. Labels are written in batches by
+    a worker thread, off the event loop.
+    """
+
+    def __init__(self, path: str = LABEL_LOG_PATH, max_bytes: int = LABEL_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.written = 0
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._file = None
+        # Lines not written yet
+        self._pending: List[str] = []
+        self._write_task: Optional[asyncio.Task] = None
+
+    def record(self, ocr_text: str, detection: Dict[str, Any]) -> None:
+        """Log one LLM verdict; errors and malformed verdicts are never labels"""
+        if not self.path or detection.get("error") or "platform" not in detection:
+            return
+        line = json.dumps({
+            "time": time.time(),
+            "text": ocr_text,
+            "detected": bool(detection.get("detected", False)),
+            "platform": detection.get("platform") or "none",
+            "confidence": detection.get("confidence", 0.0),
+        })
+        with self._lock:
+            self._pending.append(line)
+        self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        """Write pending labels in the background, or right away outside an event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_pending()
+            return
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_in_background())
+
+    async def _write_in_background(self) -> None:
+        # Labels recorded while a batch is being written are picked up by the next one
+        while self._pending:
+            await asyncio.to_thread(self._write_pending)
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            lines, self._pending = self._pending, []
+        if not lines:
+            return
+        with self._file_lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(line + "\n" for line in lines))
+            self._file.flush()
+            self.written += len(lines)
+            if self._file.tell() >= self.max_bytes:
+                self._file.close()
+                self._file = None
+                os.replace(self.path, rotated_path(self.path))
+
+    async def flush(self) -> None:
+        """Write every pending label (on shutdown)"""
+        if self.path:
+            await asyncio.to_thread(self._write_pending)
+
+    def close(self) -> None:
+        self._write_pending()
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def iter_labels(path: str, min_confidence: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """
+    Stream logged labels, oldest first across the rotated and the current file,
+    skipping lines that can't be parsed (e.g. a torn last line)
+    """
+    parts = [part for part in (rotated_path(path), path) if os.path.exists(part)] or [path]
+    for part in parts:
+        with open(part, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    label = json.loads(line)
+                except ValueError:
+                    continue
+                if label.get("confidence", 0.0) >= min_confidence and label.get("text"):
+                    yield label
+
+
+label_log = LabelLog()
@@ -1,20 +1,224 @@
 import os
+import json
+import asyncio
+import time
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
 
 load_dotenv()
 
+# Local modules read their tuning from the environment at import time
+from classification_cache import classification_cache, compact_cache_key
+from ocr_compaction import compact_ocr_text
+from prefilter import prefilter, PrefilterResult
+from local_model import get_local_model, LocalPrediction
+from label_log import label_log
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import LLM_CALLS, LLM_SECONDS, LLM_QUEUE_SECONDS, LLM_TOKENS, LLM_COALESCED, PREFILTER_VERDICTS, LOCAL_MODEL_VERDICTS, timed
+
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 if not GROQ_API_KEY:
     raise ValueError("❌ GROQ_API_KEY is not set. Please add it to your .env file.")
 
-client = Groq(api_key=GROQ_API_KEY)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_DETECT_TIMEOUT = float(os.getenv("LLM_DETECT_TIMEOUT", "5"))
+LLM_MESSAGE_TIMEOUT = float(os.getenv("LLM_MESSAGE_TIMEOUT", "5"))
+# Longest a call waits for a concurrency slot before it is answered without Groq
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "1"))
+# While the circuit is open, ambiguous frames whose keyword guess is at least this confident
+# still count. Guesses that only name a platform never do, however confident: a lone
+# "tiktok" scores 0.75, and it may just be a mention in an article or a chat
+DEGRADED_MIN_CONFIDENCE = float(os.getenv("DEGRADED_MIN_CONFIDENCE", "0.72"))
+
+DEFAULT_DETECTION = {"detected": False, "platform": "none", "confidence": 0.0}
+DEFAULT_INTERVENTION_MESSAGE = "You've been scrolling for a while. Maybe take a quick break?"
+
+# Point at an OpenAI-compatible stand-in (e.g. bench/fake_groq.py) instead of api.groq.com
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or "https://api.groq.com"
+
+client = AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+
+# Bounds how many Groq requests can be in flight at once across all endpoints
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+class LLMBusyError(Exception):
+    """Raised when no concurrency slot frees up within LLM_QUEUE_TIMEOUT"""
+
+async def _probe_groq() -> None:
+    """Smallest possible completion, used to check whether Groq has recovered"""
+    await asyncio.wait_for(
+        client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1,
+        ),
+        timeout=LLM_DETECT_TIMEOUT
+    )
+
+# Stops calling Groq while it is failing or slow, so requests are answered locally without waiting
+llm_breaker = CircuitBreaker("Groq", _probe_groq)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller starts the call
+    and everyone who asks for that key before it finishes awaits the same result.
+    kind labels the calls saved in /metrics.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is not None:
+            LLM_COALESCED.inc(kind=self.kind)
+        else:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # A waiter that gives up (client disconnect, timeout) mustn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
 
-def detect_short_form_video(ocr_text: str) -> dict:
+_detect_flights = SingleFlight("detect")
+
+async def _chat_completion(kind: str, timeout: float, **kwargs):
+    """
+    Run a chat completion under the concurrency limit. Waiting for a slot is
+    bounded by LLM_QUEUE_TIMEOUT and timed separately; the deadline, latency and
+    circuit breaker outcome only cover the Groq call itself, so a busy server
+    doesn't look like a slow Groq. kind ("detect", "variants") labels the call in /metrics.
+    Raises CircuitOpenError without calling Groq while the circuit breaker is open,
+    and LLMBusyError if every slot stays taken.
+    """
+    if not llm_breaker.allow():
+        LLM_CALLS.inc(kind=kind, outcome="rejected")
+        raise CircuitOpenError()
+
+    queued = time.perf_counter()
+    try:
+        await asyncio.wait_for(_llm_semaphore.acquire(), timeout=LLM_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        LLM_CALLS.inc(kind=kind, outcome="busy")
+        raise LLMBusyError()
+    finally:
+        LLM_QUEUE_SECONDS.observe(time.perf_counter() - queued, kind=kind)
+
+    try:
+        # The circuit may have opened while this call was queued
+        if not llm_breaker.allow():
+            LLM_CALLS.inc(kind=kind, outcome="rejected")
+            raise CircuitOpenError()
+
+        started = time.perf_counter()
+        try:
+            with timed(LLM_SECONDS, kind=kind):
+                response = await asyncio.wait_for(client.chat.completions.create(**kwargs), timeout=timeout)
+        except asyncio.TimeoutError:
+            LLM_CALLS.inc(kind=kind, outcome="timeout")
+            llm_breaker.record(failed=True, seconds=time.perf_counter() - started)
+            raise
+        except Exception:
+            LLM_CALLS.inc(kind=kind, outcome="error")
+            llm_breaker.record(failed=True, seconds=time.perf_counter() - started)
+            raise
+    finally:
+        _llm_semaphore.release()
+
+    llm_breaker.record(failed=False, seconds=time.perf_counter() - started)
+
+    LLM_CALLS.inc(kind=kind, outcome="success")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, kind=kind, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, kind=kind, type="completion")
+    return response
+
+def _log_label(ocr_text: str, result: str) -> None:
+    """Keep an LLM verdict as a training label for the local model"""
+    try:
+        detection = json.loads(result)
+    except ValueError:
+        return
+    if isinstance(detection, dict):
+        label_log.record(ocr_text, detection)
+
+async def detect_short_form_video(ocr_text: str) -> str:
     """
     Uses Groq to classify if the user is on a short-form video platform.
-    Returns platform information or None if not detected.
+    Returns the classification as a JSON string ("detected", "platform", "confidence").
+    Frames with obvious platform markers (or none at all) are decided by the local
+    keyword pre-classifier. Ambiguous frames are then scored by the local model
+    distilled from earlier LLM verdicts, and only those it isn't sure about reach
+    the LLM, whose verdicts are logged as new training labels.
+    LLM results are cached by a normalized hash of the OCR text.
+    """
+    local_result = prefilter(ocr_text)
+    PREFILTER_VERDICTS.inc(verdict=local_result.verdict)
+    if local_result.verdict != "ambiguous":
+        return json.dumps(local_result.to_detection())
+
+    # Only the lines most likely to name a platform, within the prompt token budget
+    compact_text = compact_ocr_text(ocr_text)
+    key = compact_cache_key(compact_text)
+    cached = classification_cache.get(key)
+    if cached is not None:
+        return cached
+
+    prediction = None
+    model = get_local_model()
+    if model is not None:
+        prediction = model.predict(ocr_text)
+        if prediction.confident:
+            LOCAL_MODEL_VERDICTS.inc(verdict="local")
+            return json.dumps(prediction.to_detection())
+        LOCAL_MODEL_VERDICTS.inc(verdict="deferred")
+
+    # Groq is down or slow: answer locally right away instead of waiting out a timeout
+    if not llm_breaker.allow():
+        return _degraded_detection(local_result, prediction)
+
+    # Equivalent frames arriving together (several devices, client retries) share one call
+    result = await _detect_flights.do(key, lambda: _classify_with_llm(ocr_text, compact_text, key))
+    if result is None:
+        # Groq couldn't be asked in time: the circuit opened, or every slot stayed busy
+        return _degraded_detection(local_result, prediction)
+    return result
+
+def _degraded_detection(local_result: PrefilterResult, prediction: Optional[LocalPrediction]) -> str:
+    """
+    Best local answer for an ambiguous frame Groq can't be asked about: the
+    distilled model's verdict, else the keyword scores' leading platform if it
+    is clear enough. Never cached, so the frame is classified properly once
+    Groq is back.
+    """
+    if prediction is not None:
+        detection = prediction.to_detection()
+    elif (local_result.platform != "none" and not local_result.name_only
+          and local_result.confidence >= DEGRADED_MIN_CONFIDENCE):
+        detection = {"detected": True, "platform": local_result.platform, "confidence": local_result.confidence}
+    else:
+        detection = dict(DEFAULT_DETECTION)
+    detection["source"] = "degraded"
+    return json.dumps(detection)
+
+async def _classify_with_llm(ocr_text: str, compact_text: str, key: str) -> Optional[str]:
+    """
+    Ask Groq to classify compacted OCR text, then cache and log the verdict.
+    Returns None if Groq can't be asked right now (circuit open, or no slot free
+    within LLM_QUEUE_TIMEOUT). A single failed call (error or deadline) is just no
+    detection: guessing from keywords is reserved for when Groq is out of reach.
     """
     prompt = f"""
     You are an AI classifier for detecting short-form video platforms from screen content.
@@ -46,11 +250,13 @@ def detect_short_form_video(ocr_text: str) -> dict:
     3. "confidence": your confidence level (0.0-1.0)
     
     **OCR TEXT TO ANALYZE:**
-    "{ocr_text}"
+    "{compact_text}"
     """
 
     try:
-        response = client.chat.completions.create(
+        response = await _chat_completion(
+            "detect",
+            LLM_DETECT_TIMEOUT,
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1,
@@ -59,47 +265,66 @@ def detect_short_form_video(ocr_text: str) -> dict:
         )
 
         result = response.choices[0].message.content
+        classification_cache.put(key, result)
+        _log_label(ocr_text, result)
         return result
 
+    except (CircuitOpenError, LLMBusyError):
+        return None
+    except asyncio.TimeoutError:
+        print(f"⚠️ Platform classification exceeded {LLM_DETECT_TIMEOUT}s deadline")
+        return json.dumps({**DEFAULT_DETECTION, "error": "timeout"})
     except Exception as e:
         print(f"❌ Error classifying video platform: {e}")
-        return {"detected": False, "platform": "none", "confidence": 0.0, "error": str(e)}
+        return json.dumps({**DEFAULT_DETECTION, "error": str(e)})
 
 
-def generate_intervention_message(platform: str, usage_stats: dict) -> str:
+async def generate_intervention_variants(platform: str, reason: str, usage: str, count: int) -> List[str]:
     """
-    Generates a personalized intervention message based on usage patterns.
+    Generates several alternative intervention messages in a single LLM call.
+    usage is the bucketed usage figure (e.g. "about 45 minutes today"); the pool
+    is shared across tenants, so exact figures never reach the prompt.
+    Used to fill the message pool in the background; returns an empty list on failure.
     """
     prompt = f"""
     You are ScreenBreak, a digital wellbeing assistant that helps users be mindful of their 
-    short-form video consumption. Create a friendly, non-judgmental intervention message
-    based on the user's current usage statistics.
+    short-form video consumption. Create {count} different friendly, non-judgmental intervention
+    messages based on the user's current usage.
     
     **PLATFORM:** {platform}
-    **TODAY'S USAGE:** {usage_stats.get('today_minutes', 0)} minutes
-    **DAILY GOAL:** {usage_stats.get('daily_goal_minutes', 30)} minutes
-    **CURRENT SESSION:** {usage_stats.get('current_session_minutes', 0)} minutes
-    **TIMES OPENED TODAY:** {usage_stats.get('times_opened_today', 0)}
+    **REASON:** {reason.replace('_', ' ')}
+    **USAGE:** {usage}
+    
+    Each message should be brief and encouraging (max 2 sentences) and:
+    1. Acknowledge their current usage in a non-judgmental way, using approximate figures
+    2. Gently suggest an alternative activity or remind them of their goal
+    3. Use a supportive, friendly tone
     
-    Create a brief, encouraging message (max 2 sentences) that:
-    1. Acknowledges their current usage in a non-judgmental way
-    2. Gently suggests an alternative activity or reminds them of their goal
-    3. Uses a supportive, friendly tone
+    Vary the wording and suggested activities between messages.
     
-    The message should be short enough to display as a notification.
+    **RESPONSE FORMAT:**
+    Return a JSON object with a single field "messages" containing a list of {count} strings.
     """
 
     try:
-        response = client.chat.completions.create(
+        response = await _chat_completion(
+            "variants",
+            LLM_MESSAGE_TIMEOUT,
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=100,
+            temperature=0.9,
+            max_tokens=100 * count,
+            response_format={"type": "json_object"}
         )
 
-        message = response.choices[0].message.content.strip()
-        return message
+        messages = json.loads(response.choices[0].message.content).get("messages", [])
+        return [m.strip() for m in messages if isinstance(m, str) and m.strip()]
 
+    except (CircuitOpenError, LLMBusyError):
+        return []
+    except asyncio.TimeoutError:
+        print(f"⚠️ Intervention variants exceeded {LLM_MESSAGE_TIMEOUT}s deadline")
+        return []
     except Exception as e:
-        print(f"❌ Error generating intervention message: {e}")
-        return "You've been scrolling for a while. Maybe take a quick break?"
\ No newline at end of file
+        print(f"❌ Error generating intervention variants: {e}")
+        return []
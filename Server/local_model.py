@@ -0,0 +1,157 @@
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from classification_cache import normalize_ocr_text
+
+# NumPy makes scoring a single vectorized gather; without it the same sums are done in Python
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Model written by train_local_model.py; the LLM handles every ambiguous frame until it exists
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "local_model.json")
+# Frames whose top class doesn't beat the runner-up by this much probability go to the LLM
+LOCAL_MODEL_MIN_MARGIN = float(os.getenv("LOCAL_MODEL_MIN_MARGIN", "0.6"))
+
+CLASSES = ["TikTok", "Instagram Reels", "YouTube Shorts", "Snapchat", "Facebook Reels", "none"]
+DEFAULT_HASH_BUCKETS = 2 ** 18
+
+_TOKEN_RE = re.compile(r"[@#]?[a-z0-9_']+")
+
+
+def extract_features(ocr_text: str, buckets: int = DEFAULT_HASH_BUCKETS) -> List[int]:
+    """
+    Hashed word unigrams and bigrams of the normalized OCR text, each counted once.
+    crc32 rather than hash() so ids are stable across processes and Python versions.
+    """
+    tokens = _TOKEN_RE.findall(normalize_ocr_text(ocr_text))
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return sorted({zlib.crc32(gram.encode("utf-8")) % buckets for gram in grams})
+
+
+@dataclass
+class LocalPrediction:
+    platform: str
+    probability: float
+    margin: float
+
+    @property
+    def confident(self) -> bool:
+        return self.margin >= LOCAL_MODEL_MIN_MARGIN
+
+    def to_detection(self) -> Dict[str, object]:
+        """Shape the prediction like the LLM classifier's JSON response"""
+        detected = self.platform != "none"
+        return {
+            "detected": detected,
+            "platform": self.platform,
+            "confidence": round(self.probability, 3),
+            "source": "local_model"
+        }
+
+
+class LocalModel:
+    """
+    Multinomial naive Bayes over hashed n-gram features, distilled from logged LLM
+    verdicts. Only features seen in training are stored: each stores its log-odds
+    against the per-class weight of an unseen feature, so scoring a frame is the
+    class bias plus one row lookup per feature it contains.
+    """
+
+    def __init__(self, classes: List[str], buckets: int, bias: List[float],
+                 unseen: List[float], features: Dict[int, List[float]]):
+        self.classes = classes
+        self.buckets = buckets
+        self.bias = bias
+        self.unseen = unseen
+        self.features = features
+        if np is not None:
+            self._rows = {feature: row for row, feature in enumerate(features)}
+            self._weights = np.array(list(features.values()), dtype=np.float64).reshape(-1, len(classes))
+            self._bias = np.array(bias, dtype=np.float64)
+            self._unseen = np.array(unseen, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalModel":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            data["classes"], data["buckets"], data["bias"], data["unseen"],
+            {int(feature): weights for feature, weights in data["features"].items()}
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({
+                "classes": self.classes,
+                "buckets": self.buckets,
+                "bias": self.bias,
+                "unseen": self.unseen,
+                "features": {str(feature): weights for feature, weights in self.features.items()},
+            }, f)
+
+    def _scores(self, features: List[int]) -> List[float]:
+        if np is not None:
+            rows = [self._rows[feature] for feature in features if feature in self._rows]
+            scores = self._bias + self._unseen * len(features)
+            if rows:
+                scores = scores + self._weights[rows].sum(axis=0)
+            return scores.tolist()
+
+        scores = [b + u * len(features) for b, u in zip(self.bias, self.unseen)]
+        for feature in features:
+            weights = self.features.get(feature)
+            if weights is not None:
+                scores = [s + w for s, w in zip(scores, weights)]
+        return scores
+
+    def predict(self, ocr_text: str) -> LocalPrediction:
+        """Most likely class, its posterior probability and its lead over the runner-up"""
+        return self.predict_features(extract_features(ocr_text, self.buckets))
+
+    def predict_features(self, features: List[int]) -> LocalPrediction:
+        scores = self._scores(features)
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        ranked = sorted(range(len(scores)), key=lambda i: exps[i], reverse=True)
+        best = exps[ranked[0]] / total
+        runner_up = exps[ranked[1]] / total if len(ranked) > 1 else 0.0
+        return LocalPrediction(self.classes[ranked[0]], best, best - runner_up)
+
+
+def load_local_model(path: str = LOCAL_MODEL_PATH) -> Optional[LocalModel]:
+    """Load the distilled model, or None if it hasn't been trained yet or can't be read"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        model = LocalModel.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"❌ Could not load local model from {path}: {e}")
+        return None
+    logger.info(f"🧠 Loaded local model with {len(model.features)} features from {path}")
+    return model
+
+
+_model: Optional[LocalModel] = load_local_model()
+
+
+def get_local_model() -> Optional[LocalModel]:
+    return _model
+
+
+def reload_local_model(path: str = LOCAL_MODEL_PATH) -> Optional[LocalModel]:
+    """Swap in a freshly trained model without restarting the server"""
+    global _model
+    _model = load_local_model(path)
+    return _model
@@ -1,20 +1,57 @@
 # Update your main.py in the server folder to add CORS
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware  # Add this import
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from typing import Dict, Any, List, Optional
 import logging
+import asyncio
 import json
+import time
 import datetime
 import os
 from pydantic import BaseModel
 
-from llm import detect_short_form_video, generate_intervention_message
+from llm import detect_short_form_video, llm_breaker
+from circuit_breaker import STATES
+from classification_cache import classification_cache, cache_key
+from message_pool import intervention_messages
+from local_model import get_local_model, reload_local_model
+from label_log import label_log
+from events import subscriber_count
+from metrics import registry, stage, HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+from rollups import GRANULARITIES
+from screen_frames import (
+    ScreenFrame,
+    ClassifiedFrame,
+    frames_from_screenpipe,
+    foreground_detections,
+)
 from db_manager import (
     init_db, 
-    record_session, 
+    close_db,
+    acquire_store,
+    release_store,
+    bind_store,
+    unbind_store,
+    current_store,
+    current_broker,
+    open_tenant_count,
+    is_valid_tenant_id,
+    UnknownTenantError,
+    reset_tenant_database,
+    DEFAULT_TENANT,
+    TENANT_HEADER,
+    record_sessions,
+    parse_timestamp,
     get_usage_stats, 
+    get_usage_history,
+    run_retention,
+    iter_archived_sessions,
+    get_current_platform,
     check_intervention_needed,
-    update_user_settings
+    update_user_settings,
+    flush_usage_state,
+    load_usage_state
 )
 app = FastAPI()
 app.add_middleware(
@@ -27,11 +64,85 @@ app.add_middleware(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Components that already keep their own counters are read only when /metrics is scraped
+registry.callback("screenbreak_classification_cache_entries", "Entries in the classification cache",
+                  lambda: classification_cache.stats()["entries"])
+registry.callback("screenbreak_classification_cache_lookups_total", "Classification cache lookups by result",
+                  lambda: {"hit": classification_cache.hits, "miss": classification_cache.misses},
+                  kind="counter", labelname="result")
+registry.callback("screenbreak_classification_cache_hit_ratio", "Share of classification cache lookups that hit",
+                  lambda: classification_cache.stats()["hit_ratio"])
+registry.callback("screenbreak_message_pool_messages", "Pre-generated intervention messages in the pool",
+                  lambda: intervention_messages.stats()["messages"])
+registry.callback("screenbreak_event_subscribers", "Connected dashboard event streams",
+                  subscriber_count)
+registry.callback("screenbreak_llm_circuit_state", "1 for the Groq circuit breaker's current state",
+                  lambda: {state: int(llm_breaker.state == state) for state in STATES}, labelname="state")
+registry.callback("screenbreak_llm_circuit_transitions_total", "Groq circuit breaker state changes",
+                  lambda: llm_breaker.transitions, kind="counter", labelname="state")
+registry.callback("screenbreak_open_tenants", "Tenant databases currently open",
+                  open_tenant_count)
+
+# The only requests that may create a tenant: ones that record data or settings
+TENANT_CREATING_ROUTES = {
+    ("POST", "/process_screen"),
+    ("POST", "/process_screen_batch"),
+    ("POST", "/update_settings"),
+}
+
+@app.middleware("http")
+async def bind_tenant(request: Request, call_next):
+    """
+    Route the request to its tenant's database and usage state. The tenant comes from
+    the X-Tenant-ID header, or a ?tenant= query parameter for clients that can't set
+    headers (EventSource); requests without either use the default tenant. A
+    tenant's database is created by its first screen or settings update; any other
+    request for an unknown tenant, including one to an unknown route, is a 404.
+    """
+    if request.method == "OPTIONS":
+        # CORS preflights are answered without touching any tenant
+        return await call_next(request)
+    tenant_id = request.headers.get(TENANT_HEADER) or request.query_params.get("tenant") or DEFAULT_TENANT
+    if not is_valid_tenant_id(tenant_id):
+        return JSONResponse(status_code=400, content={"detail": "Invalid tenant id"})
+    try:
+        store = await acquire_store(tenant_id, create=(request.method, request.url.path) in TENANT_CREATING_ROUTES)
+    except UnknownTenantError:
+        return JSONResponse(status_code=404, content={"detail": "Unknown tenant"})
+    token = bind_store(store)
+    try:
+        return await call_next(request)
+    finally:
+        unbind_store(token)
+        release_store(store)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency and status counts per route template"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route_path)
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=str(status))
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_db_client():
     await init_db()
 
+# Close pooled database connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    await classification_cache.flush()
+    await label_log.flush()
+    await close_db()
+
 class UserSettings(BaseModel):
     daily_limit_minutes: Optional[int] = 60
     session_limit_minutes: Optional[int] = 15  # Changed from 1 to 15 to match default in db_manager
@@ -55,67 +166,152 @@ def standardize_platform_name(platform: str) -> str:
     else:
         return platform.title()  # Capitalize for display purposes
 
+async def build_intervention(platform: str, usage_stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decide whether to intervene and, if so, build the intervention payload"""
+    with stage("check_intervention"):
+        intervention_needed, reason = await check_intervention_needed(platform, usage_stats)
+    if not intervention_needed:
+        return None
+    
+    # Pick a pre-generated personalized message
+    with stage("intervention_message"):
+        message = intervention_messages.get_message(platform, reason, usage_stats)
+    
+    # Determine intervention type based on usage severity
+    if usage_stats.get("current_session_minutes", 0) > 30 or usage_stats.get("today_minutes", 0) > 90:
+        intervention_type = "overlay"  # More intrusive for heavy usage
+    else:
+        intervention_type = "notification"  # Less intrusive for moderate usage
+    
+    logger.info(f"⚠️ Intervention triggered: {reason}")
+    
+    return {
+        "type": intervention_type,
+        "message": message,
+        "reason": reason,
+        "usage_stats": usage_stats
+    }
+
+async def publish_updates(platform: str, intervention_data: Optional[Dict[str, Any]]) -> None:
+    """Push usage and intervention changes to connected dashboards"""
+    broker = current_broker()
+    broker.publish("usage", await get_usage_stats())
+    
+    # Only a change of platform, reason or type is a new intervention; fresh message
+    # wording for the same situation isn't worth a push
+    if intervention_data:
+        dedupe_key = (platform, intervention_data["reason"], intervention_data["type"])
+    else:
+        dedupe_key = None
+    broker.publish(
+        "intervention",
+        {"intervention_required": bool(intervention_data), "intervention_data": intervention_data},
+        dedupe_key=dedupe_key or "none"
+    )
+
+async def classify_texts(texts: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Classify many OCR texts at once. Texts that normalize to the same cache key
+    share a single classification (and at most one LLM call).
+    """
+    unique: Dict[str, str] = {}
+    for text in texts:
+        unique.setdefault(cache_key(text), text)
+    
+    keys = list(unique.keys())
+    results = await asyncio.gather(*(detect_short_form_video(unique[key]) for key in keys))
+    by_key = {key: json.loads(result) for key, result in zip(keys, results)}
+    return {text: by_key[cache_key(text)] for text in texts}
+
+async def classify_frames(frames: List[ScreenFrame]) -> List[ClassifiedFrame]:
+    """Classify every frame in one pass, as (frame, standardized platform or "none", confidence)"""
+    classifications = await classify_texts([frame.text for frame in frames])
+    classified = []
+    for frame in frames:
+        platform_info = classifications[frame.text]
+        detected = platform_info.get("detected", False) and platform_info.get("platform") != "none"
+        platform = standardize_platform_name(platform_info.get("platform")) if detected else "none"
+        classified.append((frame, platform, platform_info.get("confidence", 0)))
+    return classified
+
+def frame_summary(entry: ClassifiedFrame, foregrounds: List[ClassifiedFrame]) -> Dict[str, Any]:
+    frame, platform, confidence = entry
+    return {
+        "timestamp": frame.timestamp,
+        "app_name": frame.app_name,
+        "window_name": frame.window_name,
+        "focused": frame.focused,
+        "platform": platform,
+        "confidence": confidence,
+        "foreground": any(entry is foreground for foreground in foregrounds)
+    }
+
 @app.post("/process_screen")
 async def process_screen(request: Request) -> Dict[str, Any]:
+    """
+    Classify every window and monitor in a ScreenPipe response, then attribute
+    each capture's usage to its foreground window (see screen_frames.foreground_detections).
+    The response and intervention decision follow the most recent detection.
+    """
     try:
-        data = await request.json()
+        with stage("parse_request"):
+            data = await request.json()
 
-        if "data" not in data or not isinstance(data["data"], list) or not data["data"]:
-            raise HTTPException(status_code=400, detail="Invalid OCR data format: Missing 'data' field.")
+            if "data" not in data or not isinstance(data["data"], list) or not data["data"]:
+                raise HTTPException(status_code=400, detail="Invalid OCR data format: Missing 'data' field.")
 
-        ocr_text = data["data"][0]["content"].get("text", "").strip()
-        timestamp = data.get("timestamp", datetime.datetime.now().isoformat())
+            frames = frames_from_screenpipe(data)
         
-        if not ocr_text:
+        if not frames:
             raise HTTPException(status_code=400, detail="No text found in OCR data.")
 
-        # Analyze the screen content
-        platform_info = json.loads(detect_short_form_video(ocr_text))
+        # Items without their own timestamp were captured when the response was
+        fallback_timestamp = data.get("timestamp") or datetime.datetime.now().isoformat()
+        for frame in frames:
+            frame.timestamp = frame.timestamp or fallback_timestamp
+
+        # Analyze the screen content; identical texts share one classification
+        with stage("classify"):
+            classified = await classify_frames(frames)
+            detections = foreground_detections(classified)
+        foreground = detections[-1] if detections else None
         
-        logger.info(f"🔍 Platform detection result: {platform_info}")
+        logger.info(
+            f"🔍 Platform detection over {len(frames)} items: "
+            f"{foreground[1] if foreground else 'none'}"
+        )
         
         response_data = {
             "status": "success",
-            "platform_detected": platform_info.get("detected", False),
-            "platform": platform_info.get("platform", "none"),
-            "confidence": platform_info.get("confidence", 0),
+            "platform_detected": foreground is not None,
+            "platform": foreground[1] if foreground else "none",
+            "confidence": foreground[2] if foreground else 0,
+            "items": [frame_summary(entry, detections) for entry in classified],
             "intervention_required": False
         }
         
-        # If a video platform is detected, record the session and check if intervention is needed
-        if platform_info.get("detected", False) and platform_info.get("platform") != "none":
-            # Standardize platform name
-            platform = standardize_platform_name(platform_info.get("platform"))
-            response_data["platform"] = platform
+        # If a video platform is in the foreground, record the session and check if intervention is needed
+        if foreground:
+            platform = foreground[1]
             
-            # Record this detection in the database
-            await record_session(platform, timestamp)
+            # Record every capture's detection in the database
+            with stage("record_session"):
+                await record_sessions([(detected, frame.timestamp) for frame, detected, _ in detections])
             
             # Get usage statistics for the user
-            usage_stats = await get_usage_stats(platform)
+            with stage("usage_stats"):
+                usage_stats = await get_usage_stats(platform)
+            response_data["usage_stats"] = usage_stats
             
             # Check if we need to show an intervention
-            intervention_needed, reason = await check_intervention_needed(platform, usage_stats)
+            intervention_data = await build_intervention(platform, usage_stats)
             
-            if intervention_needed:
-                # Generate a personalized message
-                message = generate_intervention_message(platform, usage_stats)
-                
-                # Determine intervention type based on usage severity
-                if usage_stats.get("current_session_minutes", 0) > 30 or usage_stats.get("today_minutes", 0) > 90:
-                    intervention_type = "overlay"  # More intrusive for heavy usage
-                else:
-                    intervention_type = "notification"  # Less intrusive for moderate usage
-                
+            if intervention_data:
                 response_data["intervention_required"] = True
-                response_data["intervention_data"] = {
-                    "type": intervention_type,
-                    "message": message,
-                    "reason": reason,
-                    "usage_stats": usage_stats
-                }
-                
-                logger.info(f"⚠️ Intervention triggered: {reason}")
+                response_data["intervention_data"] = intervention_data
+            
+            with stage("publish"):
+                await publish_updates(platform, intervention_data)
         
         return response_data
 
@@ -124,11 +320,105 @@ async def process_screen(request: Request) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class OCRFrame(BaseModel):
+    text: str
+    timestamp: Optional[str] = None
+    app_name: Optional[str] = None
+    window_name: Optional[str] = None
+    focused: Optional[bool] = None
+
+class FrameBatch(BaseModel):
+    frames: List[OCRFrame]
+
+@app.post("/process_screen_batch")
+async def process_screen_batch(batch: FrameBatch) -> Dict[str, Any]:
+    """
+    Process many timestamped OCR frames in one request. Identical texts are
+    classified once, frames captured together count as one capture attributed
+    to its foreground window, all session updates are persisted together, and a
+    single intervention decision is made for the most recent detection.
+    """
+    try:
+        now = datetime.datetime.now().isoformat()
+        frames = sorted(
+            (
+                ScreenFrame(
+                    text=frame.text.strip(),
+                    timestamp=frame.timestamp or now,
+                    app_name=frame.app_name,
+                    window_name=frame.window_name,
+                    focused=frame.focused,
+                )
+                for frame in batch.frames
+            ),
+            key=lambda frame: parse_timestamp(frame.timestamp)
+        )
+        with stage("classify"):
+            classified = await classify_frames([frame for frame in frames if frame.text])
+            foregrounds = foreground_detections(classified)
+        detections = [(platform, frame.timestamp) for frame, platform, _ in foregrounds]
+        by_frame = {id(entry[0]): entry for entry in classified}
+        foreground_frames = {id(frame) for frame, _, _ in foregrounds}
+        
+        results = []
+        distinct_texts = len({frame.text for frame in frames if frame.text})
+        for frame in frames:
+            if not frame.text:
+                results.append({"timestamp": frame.timestamp, "status": "skipped", "platform_detected": False})
+                continue
+            
+            _, platform, confidence = by_frame[id(frame)]
+            results.append({
+                "timestamp": frame.timestamp,
+                "status": "success",
+                "platform_detected": platform != "none",
+                "platform": platform,
+                "confidence": confidence,
+                "foreground": id(frame) in foreground_frames
+            })
+        
+        logger.info(f"🔍 Batch of {len(frames)} frames: {len(detections)} detections, {distinct_texts} distinct texts")
+        
+        response_data = {
+            "status": "success",
+            "results": results,
+            "platform": "none",
+            "intervention_required": False
+        }
+        
+        if detections:
+            # Apply every session update in one write
+            with stage("record_session"):
+                await record_sessions(detections)
+            
+            platform = detections[-1][0]
+            with stage("usage_stats"):
+                usage_stats = await get_usage_stats(platform)
+            intervention_data = await build_intervention(platform, usage_stats)
+            
+            response_data["platform"] = platform
+            response_data["usage_stats"] = usage_stats
+            if intervention_data:
+                response_data["intervention_required"] = True
+                response_data["intervention_data"] = intervention_data
+            
+            with stage("publish"):
+                await publish_updates(platform, intervention_data)
+        
+        return response_data
+    
+    except Exception as e:
+        logger.error(f"❌ Server Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/update_settings")
 async def update_settings(settings: UserSettings) -> Dict[str, Any]:
     """Update user preferences and limits"""
     try:
         await update_user_settings(settings.dict())
+        # New goals change the usage figures dashboards show
+        current_broker().publish("usage", await get_usage_stats())
         return {"status": "success", "message": "Settings updated successfully"}
     except Exception as e:
         logger.error(f"❌ Error updating settings: {e}")
@@ -149,9 +439,59 @@ async def get_stats() -> Dict[str, Any]:
         logger.error(f"❌ Error retrieving stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Uncomment and fix this endpoint
-import aiosqlite
-from db_manager import DB_PATH
+@app.get("/usage_history")
+async def get_history(start: Optional[str] = None, end: Optional[str] = None,
+                      granularity: str = "day", platform: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Usage per hour/day/week between two dates (YYYY-MM-DD, end inclusive).
+    Defaults to the last 7 days.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    try:
+        today = datetime.date.today()
+        end_date = datetime.date.fromisoformat(end) if end else today
+        start_date = datetime.date.fromisoformat(start) if start else end_date - datetime.timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be dates in YYYY-MM-DD format")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    try:
+        buckets = await get_usage_history(
+            datetime.datetime.combine(start_date, datetime.time.min),
+            datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min),
+            granularity,
+            platform
+        )
+        return {
+            "status": "success",
+            "granularity": granularity,
+            "data": buckets
+        }
+    except Exception as e:
+        logger.error(f"❌ Error retrieving usage history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/archive/sessions")
+async def get_archived_sessions(start: Optional[str] = None, end: Optional[str] = None,
+                                platform: Optional[str] = None) -> StreamingResponse:
+    """
+    Raw sessions that retention moved out of the live table, as newline-delimited
+    JSON, optionally limited to sessions that started between two dates
+    (YYYY-MM-DD, end inclusive). Streamed, so any amount of history can be read.
+    """
+    try:
+        start_time = datetime.datetime.fromisoformat(start) if start else None
+        end_time = datetime.datetime.fromisoformat(end) + datetime.timedelta(days=1) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be dates in YYYY-MM-DD format")
+
+    sessions = iter_archived_sessions(start_time, end_time, platform)
+    return StreamingResponse(
+        (json.dumps(session) + "\n" for session in sessions),
+        media_type="application/x-ndjson"
+    )
 
 @app.get("/check_intervention")
 async def check_for_intervention():
@@ -162,14 +502,7 @@ async def check_for_intervention():
     """
     try:
         # Get current platform session if any
-        current_platform = None
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute(
-                "SELECT platform FROM sessions WHERE end_time IS NULL ORDER BY start_time DESC LIMIT 1"
-            )
-            result = await cursor.fetchone()
-            if result:
-                current_platform = result[0]
+        current_platform = get_current_platform()
         
         if not current_platform:
             return {
@@ -180,26 +513,12 @@ async def check_for_intervention():
         usage_stats = await get_usage_stats(current_platform)
         
         # Check if intervention is needed
-        intervention_needed, reason = await check_intervention_needed(current_platform, usage_stats)
+        intervention_data = await build_intervention(current_platform, usage_stats)
         
-        if intervention_needed:
-            # Generate a personalized message
-            message = generate_intervention_message(current_platform, usage_stats)
-            
-            # Determine intervention type based on usage severity
-            if usage_stats.get("current_session_minutes", 0) > 30 or usage_stats.get("today_minutes", 0) > 90:
-                intervention_type = "overlay"  # More intrusive for heavy usage
-            else:
-                intervention_type = "notification"  # Less intrusive for moderate usage
-            
+        if intervention_data:
             return {
                 "intervention_required": True,
-                "intervention_data": {
-                    "type": intervention_type,
-                    "message": message,
-                    "reason": reason,
-                    "usage_stats": usage_stats
-                }
+                "intervention_data": intervention_data
             }
         
         return {
@@ -210,83 +529,106 @@ async def check_for_intervention():
         logger.error(f"❌ Error checking for intervention: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/events")
+async def stream_events() -> StreamingResponse:
+    """
+    Server-Sent Events stream of usage and intervention updates for the dashboard.
+    Events are pushed from the screen processing path only when something changes.
+    """
+    return StreamingResponse(
+        current_broker().stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Add this endpoint at the end of your file
 
 @app.get("/debug/sessions")
 async def debug_sessions() -> Dict[str, Any]:
     """Debug endpoint to view raw session data"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            db.row_factory = aiosqlite.Row
+        # Persist in-memory usage first so the raw rows are current
+        await flush_usage_state()
+        async with current_store().pool.reader("debug_sessions") as db:
             cursor = await db.execute(
                 "SELECT id, platform, start_time, end_time, duration FROM sessions ORDER BY start_time DESC LIMIT 50"
             )
             sessions = await cursor.fetchall()
             
-            # Convert to list of dicts
+            # Convert to list of dicts (pooled connections are shared, so no row_factory)
+            columns = [column[0] for column in cursor.description]
             result = []
             for session in sessions:
-                result.append(dict(session))
+                result.append(dict(zip(columns, session)))
                 
             return {"sessions": result}
     except Exception as e:
         logger.error(f"❌ Error retrieving debug data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/debug/cache")
+async def debug_cache() -> Dict[str, Any]:
+    """Debug endpoint to view classification cache, message pool and local model counters"""
+    model = get_local_model()
+    return {
+        "status": "success",
+        "cache": classification_cache.stats(),
+        "message_pool": intervention_messages.stats(),
+        "local_model": {"loaded": model is not None, "features": len(model.features) if model else 0},
+        "llm_circuit": llm_breaker.stats(),
+        "labels_logged": label_log.written
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus text-format metrics: per-stage, LLM, database and cache timings and counters"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Add this admin endpoint at the end of your file
 
 @app.get("/admin/fix-platform-names")
 async def fix_platform_names() -> Dict[str, Any]:
     """Admin endpoint to standardize platform names in the database"""
     try:
-        updated_sessions = 0
-        updated_stats = 0
+        # Persist in-memory usage before rewriting rows underneath it
+        await flush_usage_state()
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # First, get and update all sessions
-            cursor = await db.execute("SELECT id, platform FROM sessions")
-            sessions = await cursor.fetchall()
+        async with current_store().pool.writer("fix_platform_names") as db:
+            # Let SQL call the same normalization the detection path uses
+            await db.create_function("standardize_platform", 1, standardize_platform_name, deterministic=True)
             
-            for session_id, platform in sessions:
-                standardized_name = standardize_platform_name(platform)
-                if standardized_name != platform:
-                    await db.execute(
-                        "UPDATE sessions SET platform = ? WHERE id = ?",
-                        (standardized_name, session_id)
-                    )
-                    updated_sessions += 1
+            # First, rename sessions
+            cursor = await db.execute(
+                "UPDATE sessions SET platform = standardize_platform(platform) WHERE platform != standardize_platform(platform)"
+            )
+            updated_sessions = cursor.rowcount
             
-            # Next, update statistics platform breakdown
-            cursor = await db.execute("SELECT date, platform_breakdown FROM statistics")
-            stats = await cursor.fetchall()
+            # Next, merge per-day stats and rollups into their standardized names, then drop the old rows
+            cursor = await db.execute(
+                """INSERT INTO platform_stats (date, platform, minutes, sessions)
+                   SELECT date, standardize_platform(platform), minutes, sessions FROM platform_stats
+                   WHERE platform != standardize_platform(platform)
+                   ON CONFLICT(date, platform) DO UPDATE SET
+                       minutes = minutes + excluded.minutes,
+                       sessions = sessions + excluded.sessions"""
+            )
+            updated_stats = cursor.rowcount
+            await db.execute("DELETE FROM platform_stats WHERE platform != standardize_platform(platform)")
             
-            for date, platform_breakdown in stats:
-                if not platform_breakdown:
-                    continue
-                    
-                platforms = json.loads(platform_breakdown)
-                updated = False
-                new_platforms = {}
-                
-                for platform, minutes in platforms.items():
-                    standardized_name = standardize_platform_name(platform)
-                    if standardized_name in new_platforms:
-                        # Combine minutes if platform already exists under standardized name
-                        new_platforms[standardized_name] = new_platforms[standardized_name] + minutes
-                    else:
-                        new_platforms[standardized_name] = minutes
-                    
-                    if standardized_name != platform:
-                        updated = True
-                
-                if updated:
-                    await db.execute(
-                        "UPDATE statistics SET platform_breakdown = ? WHERE date = ?",
-                        (json.dumps(new_platforms), date)
-                    )
-                    updated_stats += 1
+            await db.execute(
+                """INSERT INTO usage_rollups (granularity, bucket_start, platform, minutes, sessions)
+                   SELECT granularity, bucket_start, standardize_platform(platform), minutes, sessions FROM usage_rollups
+                   WHERE platform != standardize_platform(platform)
+                   ON CONFLICT(granularity, bucket_start, platform) DO UPDATE SET
+                       minutes = minutes + excluded.minutes,
+                       sessions = sessions + excluded.sessions"""
+            )
+            await db.execute("DELETE FROM usage_rollups WHERE platform != standardize_platform(platform)")
             
             await db.commit()
+        
+        # Rebuild usage state so open sessions pick up the new names
+        await load_usage_state()
             
         return {
             "status": "success",
@@ -296,26 +638,43 @@ async def fix_platform_names() -> Dict[str, Any]:
         logger.error(f"❌ Error fixing platform names: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admin/reload-local-model")
+async def reload_model() -> Dict[str, Any]:
+    """Admin endpoint to load a newly trained local classifier without restarting"""
+    model = reload_local_model()
+    if model is None:
+        raise HTTPException(status_code=404, detail="No local model found at LOCAL_MODEL_PATH")
+    return {"status": "success", "features": len(model.features)}
+
+@app.get("/admin/run-retention")
+async def run_retention_now() -> Dict[str, Any]:
+    """Admin endpoint to archive expired sessions and vacuum now instead of on the schedule"""
+    try:
+        result = await run_retention()
+        return {"status": "success", **result}
+    except Exception as e:
+        logger.error(f"❌ Error running retention: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Add this debug endpoint
 
 @app.get("/debug/platforms")
 async def debug_platforms() -> Dict[str, Any]:
     """Debug endpoint to view all platform names in use"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
+        await flush_usage_state()
+        async with current_store().pool.reader("debug_platforms") as db:
             # Get unique platforms from sessions
             cursor = await db.execute("SELECT DISTINCT platform FROM sessions")
             platforms = [row[0] for row in await cursor.fetchall()]
             
-            # Get all platform breakdowns from statistics
-            cursor = await db.execute("SELECT date, platform_breakdown FROM statistics")
+            # Get per-day minutes for every platform
+            cursor = await db.execute("SELECT date, platform, minutes FROM platform_stats ORDER BY date, platform")
             stats_platforms = {}
             
-            for date, platform_breakdown in await cursor.fetchall():
-                if platform_breakdown:
-                    platforms_dict = json.loads(platform_breakdown)
-                    stats_platforms[date] = platforms_dict
-                
+            for date, platform, minutes in await cursor.fetchall():
+                stats_platforms.setdefault(date, {})[platform] = minutes
+            
             return {
                 "status": "success",
                 "session_platforms": platforms,
@@ -326,18 +685,10 @@ async def debug_platforms() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 @app.get("/admin/reset-database", response_model=Dict[str, Any])
 async def reset_database():
-    """Admin endpoint to completely reset the database and start fresh"""
+    """Admin endpoint to completely reset the requesting tenant's database and start fresh"""
     try:
-        import os
-        
-        # Close any database connections
-        # Delete the database file if it exists
-        if os.path.exists(DB_PATH):
-            os.remove(DB_PATH)
-            logger.info("Existing database file deleted")
-        
-        # Reinitialize the database with clean tables
-        await init_db()
+        # Close the tenant's connections, delete its database file and reinitialize clean tables
+        await reset_tenant_database()
         logger.info("Database reinitialized with fresh tables")
         
         return {
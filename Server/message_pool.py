@@ -0,0 +1,105 @@
+import asyncio
+import os
+from collections import deque
+from typing import Dict, Any, Deque, List, Set, Tuple
+
+from llm import generate_intervention_variants, DEFAULT_INTERVENTION_MESSAGE
+
+MESSAGE_POOL_SIZE = int(os.getenv("MESSAGE_POOL_SIZE", "5"))
+MESSAGE_POOL_LOW_WATER = int(os.getenv("MESSAGE_POOL_LOW_WATER", "2"))
+MESSAGE_MAX_REUSE = int(os.getenv("MESSAGE_MAX_REUSE", "3"))
+USAGE_BUCKET_MINUTES = int(os.getenv("USAGE_BUCKET_MINUTES", "5"))
+
+PoolKey = Tuple[str, str, int]
+
+
+def usage_bucket(reason: str, usage_stats: Dict[str, Any]) -> int:
+    """Round the usage figure that matters for this reason down to its bucket"""
+    if reason.startswith("daily"):
+        minutes = usage_stats.get("today_minutes", 0)
+    elif reason == "frequent_opening":
+        return usage_stats.get("times_opened_today", 0) // 5 * 5
+    else:
+        minutes = usage_stats.get("current_session_minutes", 0)
+    return int(minutes) // USAGE_BUCKET_MINUTES * USAGE_BUCKET_MINUTES
+
+
+def describe_bucket(reason: str, bucket: int) -> str:
+    """The bucketed usage figure as the prompt states it"""
+    if reason.startswith("daily"):
+        return f"about {bucket} minutes today"
+    if reason == "frequent_opening":
+        return f"opened about {bucket} times today"
+    return f"about {bucket} minutes this session"
+
+
+class MessagePool:
+    """
+    Pre-generated intervention messages keyed by (platform, reason, usage bucket).
+    Picking a message never waits on the LLM; buckets that run low are refilled
+    by a background task. The pool is shared by all tenants, so messages are
+    generated from the bucket alone, never from one tenant's exact figures.
+    """
+
+    def __init__(self):
+        # Each entry is [message, times_served]
+        self._pools: Dict[PoolKey, Deque[List[Any]]] = {}
+        self._last_served: Dict[Tuple[str, str], str] = {}
+        self._refilling: Set[PoolKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get_message(self, platform: str, reason: str, usage_stats: Dict[str, Any]) -> str:
+        """Pick a message variant for this usage state in O(1)"""
+        key = (platform, reason, usage_bucket(reason, usage_stats))
+        variants = self._pools.setdefault(key, deque())
+
+        if variants:
+            entry = variants.popleft()
+            entry[1] += 1
+            # Rotate the variant to the back until it has been shown enough times
+            if entry[1] < MESSAGE_MAX_REUSE:
+                variants.append(entry)
+            message = entry[0]
+            self._last_served[(platform, reason)] = message
+        else:
+            # Nothing generated for this bucket yet, reuse a neighbouring bucket's message
+            message = self._last_served.get((platform, reason), DEFAULT_INTERVENTION_MESSAGE)
+
+        if len(variants) <= MESSAGE_POOL_LOW_WATER:
+            self._schedule_refill(key)
+
+        return message
+
+    def _schedule_refill(self, key: PoolKey) -> None:
+        """Start a background refill for a bucket unless one is already running"""
+        if key in self._refilling:
+            return
+        self._refilling.add(key)
+        task = asyncio.create_task(self._refill(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, key: PoolKey) -> None:
+        """Top a bucket back up to MESSAGE_POOL_SIZE variants"""
+        platform, reason, bucket = key
+        try:
+            missing = MESSAGE_POOL_SIZE - len(self._pools.get(key, ()))
+            if missing <= 0:
+                return
+            messages = await generate_intervention_variants(platform, reason, describe_bucket(reason, bucket), missing)
+            variants = self._pools.setdefault(key, deque())
+            for message in messages[:missing]:
+                variants.append([message, 0])
+        finally:
+            self._refilling.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and refill activity for monitoring"""
+        return {
+            "buckets": len(self._pools),
+            "messages": sum(len(v) for v in self._pools.values()),
+            "refilling": len(self._refilling)
+        }
+
+
+intervention_messages = MessagePool()
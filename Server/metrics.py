@@ -0,0 +1,188 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache/DB work up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> Iterator[Sample]:
+        for key, (counts, total, count) in self._series.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class CallbackMetric:
+    """
+    Value read from another component when /metrics is scraped, so components that
+    already keep their own counters (caches, pools) cost nothing between scrapes.
+    The callback returns a number, or a {label value: number} dict for one label.
+    """
+
+    def __init__(self, name: str, description: str, callback: Callable[[], Any],
+                 kind: str = "gauge", labelname: str = ""):
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self.kind = kind
+        self.labelname = labelname
+
+    def samples(self) -> Iterator[Sample]:
+        value = self.callback()
+        if isinstance(value, dict):
+            for label, item in value.items():
+                yield self.name, {self.labelname: label}, item
+        else:
+            yield self.name, {}, value
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def callback(self, name: str, description: str, callback: Callable[[], Any],
+                 kind: str = "gauge", labelname: str = "") -> CallbackMetric:
+        return self.register(CallbackMetric(name, description, callback, kind, labelname))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "screenbreak_stage_seconds", "Time spent in each screen processing stage", ["stage"]
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "screenbreak_http_request_seconds", "End-to-end request latency by route", ["method", "route"]
+)
+HTTP_REQUESTS = registry.counter(
+    "screenbreak_http_requests_total", "Requests by route and status code", ["method", "route", "status"]
+)
+LLM_CALLS = registry.counter(
+    "screenbreak_llm_calls_total", "Groq calls by kind and outcome", ["kind", "outcome"]
+)
+LLM_SECONDS = registry.histogram(
+    "screenbreak_llm_call_seconds", "Groq call latency, once a concurrency slot is held", ["kind"]
+)
+LLM_QUEUE_SECONDS = registry.histogram(
+    "screenbreak_llm_queue_seconds", "Time Groq calls waited for a concurrency slot", ["kind"]
+)
+LLM_COALESCED = registry.counter(
+    "screenbreak_llm_coalesced_calls_total", "Groq calls saved by joining an identical call already in flight", ["kind"]
+)
+LLM_TOKENS = registry.counter(
+    "screenbreak_llm_tokens_total", "Tokens reported by Groq", ["kind", "type"]
+)
+PREFILTER_VERDICTS = registry.counter(
+    "screenbreak_prefilter_verdicts_total", "Keyword pre-classifier verdicts", ["verdict"]
+)
+LOCAL_MODEL_VERDICTS = registry.counter(
+    "screenbreak_local_model_verdicts_total", "Distilled local model verdicts on ambiguous frames", ["verdict"]
+)
+DB_CONNECTION_WAIT_SECONDS = registry.histogram(
+    "screenbreak_db_connection_wait_seconds", "Time waiting for a pooled connection", ["role"]
+)
+DB_OPERATION_SECONDS = registry.histogram(
+    "screenbreak_db_operation_seconds", "Database operation latency", ["operation"]
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe how long the block took, whether or not it raised"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+def stage(name: str):
+    """Time one processing stage"""
+    return timed(STAGE_SECONDS, stage=name)
@@ -0,0 +1,197 @@
+import datetime
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import aiosqlite
+
+from rollups import rollup_rows, apply_rollups
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[aiosqlite.Connection], Awaitable[None]]
+
+
+async def _create_base_schema(db: aiosqlite.Connection) -> None:
+    """Tables from the original init_db; a no-op on databases created before migrations"""
+    # Create sessions table to track platform usage
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        platform TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        duration INTEGER DEFAULT 0
+    )
+    ''')
+
+    # Create settings table for user preferences
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS settings (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        daily_limit_minutes INTEGER DEFAULT 60,
+        session_limit_minutes INTEGER DEFAULT 15,
+        intervention_frequency TEXT DEFAULT 'medium',
+        settings_json TEXT
+    )
+    ''')
+
+    # Create statistics table for aggregated data
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS statistics (
+        date TEXT PRIMARY KEY,
+        total_minutes INTEGER DEFAULT 0,
+        platform_breakdown TEXT,
+        session_count INTEGER DEFAULT 0
+    )
+    ''')
+
+    # Insert default settings if they don't exist
+    await db.execute('''
+    INSERT OR IGNORE INTO settings (id, daily_limit_minutes, session_limit_minutes, intervention_frequency)
+    VALUES (1, 60, 15, 'medium')
+    ''')
+
+
+async def _add_session_indexes(db: aiosqlite.Connection) -> None:
+    """Indexes for the hot session lookups"""
+    # Open sessions by platform (record_session, close_session, get_usage_stats).
+    # Partial, so it only ever holds the handful of sessions still open.
+    await db.execute('''
+    CREATE INDEX IF NOT EXISTS idx_sessions_open_platform
+    ON sessions (platform, start_time, duration) WHERE end_time IS NULL
+    ''')
+
+    # Most recent open session (check_intervention, overall usage stats)
+    await db.execute('''
+    CREATE INDEX IF NOT EXISTS idx_sessions_open_recent
+    ON sessions (start_time, platform, duration) WHERE end_time IS NULL
+    ''')
+
+    # Per-platform session counts over a start_time range
+    await db.execute('''
+    CREATE INDEX IF NOT EXISTS idx_sessions_platform_start
+    ON sessions (platform, start_time)
+    ''')
+
+    # Session history ordered by start time
+    await db.execute('''
+    CREATE INDEX IF NOT EXISTS idx_sessions_start
+    ON sessions (start_time)
+    ''')
+
+
+async def _add_usage_rollups(db: aiosqlite.Connection) -> None:
+    """Hourly/daily/weekly usage rollups, backfilled from existing sessions"""
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS usage_rollups (
+        granularity TEXT NOT NULL,
+        bucket_start TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket_start, platform)
+    ) WITHOUT ROWID
+    ''')
+
+    # Same rule as the live flush: minutes are spread over the time each session
+    # covered (historical sessions have no detection times) and a session counts
+    # in the bucket it started in
+    totals: Dict[Tuple[str, str, str], List[int]] = {}
+    cursor = await db.execute("SELECT platform, start_time, end_time, duration FROM sessions")
+    for platform, start_time, end_time, duration in await cursor.fetchall():
+        start = datetime.datetime.fromisoformat(start_time)
+        end = datetime.datetime.fromisoformat(end_time) if end_time else start + datetime.timedelta(minutes=duration or 0)
+        for granularity, bucket, _, minutes, sessions in rollup_rows(platform, start, end, duration or 0, start):
+            total = totals.setdefault((granularity, bucket, platform), [0, 0])
+            total[0] += minutes
+            total[1] += sessions
+    await apply_rollups(db, [key + tuple(total) for key, total in totals.items()])
+
+
+async def _normalize_platform_stats(db: aiosqlite.Connection) -> None:
+    """Move statistics.platform_breakdown JSON blobs into a (date, platform) table"""
+    await db.execute('''
+    CREATE TABLE IF NOT EXISTS platform_stats (
+        date TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (date, platform)
+    ) WITHOUT ROWID
+    ''')
+
+    # Minutes come from the blobs; malformed blobs are skipped rather than failing the upgrade
+    await db.execute('''
+    INSERT INTO platform_stats (date, platform, minutes)
+    SELECT statistics.date, breakdown.key, CAST(breakdown.value AS INTEGER)
+    FROM statistics, json_each(statistics.platform_breakdown) AS breakdown
+    WHERE json_valid(statistics.platform_breakdown)
+    ON CONFLICT(date, platform) DO UPDATE SET minutes = minutes + excluded.minutes
+    ''')
+
+    # The blobs never stored per-platform session counts; recount them from sessions
+    await db.execute('''
+    INSERT INTO platform_stats (date, platform, sessions)
+    SELECT date(start_time), platform, COUNT(*)
+    FROM sessions
+    WHERE true
+    GROUP BY date(start_time), platform
+    ON CONFLICT(date, platform) DO UPDATE SET sessions = excluded.sessions
+    ''')
+
+    # Totals are now a SUM over platform_stats
+    await db.execute("DROP TABLE statistics")
+
+
+async def _add_session_last_seen(db: aiosqlite.Connection) -> None:
+    """Time of the latest detection per session, so idle sessions can be closed accurately"""
+    await db.execute("ALTER TABLE sessions ADD COLUMN last_seen TEXT")
+
+    # Closed sessions were last seen when they ended; open ones as far as their recorded duration goes
+    await db.execute('''
+    UPDATE sessions SET last_seen = COALESCE(
+        end_time,
+        strftime('%Y-%m-%dT%H:%M:%S', start_time, '+' || COALESCE(duration, 0) || ' minutes')
+    )
+    ''')
+
+
+# Ordered list of (version, description, migration). Append only; never edit a
+# migration that has shipped, add a new one instead.
+MIGRATIONS: List[Tuple[int, str, Migration]] = [
+    (1, "base schema", _create_base_schema),
+    (2, "session indexes", _add_session_indexes),
+    (3, "usage rollups", _add_usage_rollups),
+    (4, "normalized platform stats", _normalize_platform_stats),
+    (5, "session last seen", _add_session_last_seen),
+]
+
+
+async def run_migrations(db: aiosqlite.Connection) -> int:
+    """
+    Bring the database up to the latest schema version, tracked in PRAGMA user_version.
+    Each migration runs in its own transaction together with the version bump.
+    """
+    cursor = await db.execute("PRAGMA user_version")
+    current_version = (await cursor.fetchone())[0]
+    await cursor.close()
+
+    for version, description, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        try:
+            await db.execute("BEGIN")
+            await migration(db)
+            # PRAGMA arguments can't be bound parameters; version is an int from MIGRATIONS
+            await db.execute(f"PRAGMA user_version = {int(version)}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            logger.error(f"❌ Migration {version} ({description}) failed")
+            raise
+
+        logger.info(f"🗄️ Applied migration {version}: {description}")
+        current_version = version
+
+    return current_version
@@ -0,0 +1,68 @@
+import functools
+import math
+import os
+import re
+from typing import List, Tuple
+
+from prefilter import marker_score
+
+# Rough prompt-token budget for the OCR text sent to the LLM (about 4 characters per token)
+OCR_TOKEN_BUDGET = int(os.getenv("OCR_TOKEN_BUDGET", "300"))
+# Long captions and comment walls are cut to this many characters per line
+OCR_MAX_LINE_CHARS = int(os.getenv("OCR_MAX_LINE_CHARS", "200"))
+
+CHARS_PER_TOKEN = 4
+
+# OCR output separates screen blocks with newlines, tabs or wide gaps
+_LINE_SPLIT_RE = re.compile(r"[\r\n\t]|  +")
+# Counters, timestamps and prices: 1,234 / 5.6K / 0:15 all become one placeholder
+_NUMBER_RE = re.compile(r"\d+(?:[.,:]\d+)*")
+# A run of emoji (with skin tones, variation selectors and joiners) keeps only its first emoji
+_EMOJI = "\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF"
+_EMOJI_RUN_RE = re.compile(f"([{_EMOJI}])(?:[{_EMOJI}\ufe0f\u200d]| +(?=[{_EMOJI}]))+")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@functools.lru_cache(maxsize=128)
+def compact_ocr_text(ocr_text: str, token_budget: int = OCR_TOKEN_BUDGET) -> str:
+    """
+    Shrink OCR text to what the classifier needs: number and emoji runs collapsed,
+    repeated and letterless lines dropped, then lines ranked by platform markers
+    filled into the token budget and put back in screen order. Deterministic, so
+    the same screen always compacts (and hashes) to the same text. Cached, since a
+    frame is compacted both for its cache key and for the prompt.
+    """
+    # Whole-text substitutions are much cheaper than one per line
+    text = _NUMBER_RE.sub("0", ocr_text)
+    text = _EMOJI_RUN_RE.sub(r"\1", text)
+
+    lines: List[str] = []
+    seen = set()
+    for raw_line in _LINE_SPLIT_RE.split(text):
+        line = " ".join(raw_line.split())[:OCR_MAX_LINE_CHARS]
+        if not _LETTER_RE.search(line):
+            continue
+        dedupe_key = line.lower()
+        if dedupe_key in seen:
+            continue
+        seen.add(dedupe_key)
+        lines.append(line)
+
+    # Strongest platform signal first; ties (including every unmarked line) keep screen order
+    ranked: List[Tuple[float, int]] = sorted(
+        (-marker_score(line), position) for position, line in enumerate(lines)
+    )
+    kept = []
+    remaining = token_budget
+    for _, position in ranked:
+        # Newline separators count towards the budget too
+        cost = estimate_tokens(lines[position]) + 1
+        if cost <= remaining:
+            kept.append(position)
+            remaining -= cost
+
+    return "\n".join(lines[position] for position in sorted(kept))
@@ -0,0 +1,198 @@
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+PREFILTER_HIT_SCORE = float(os.getenv("PREFILTER_HIT_SCORE", "3.0"))
+PREFILTER_MIN_CONFIDENCE = float(os.getenv("PREFILTER_MIN_CONFIDENCE", "0.75"))
+
+# Literal markers from the DETECTION CRITERIA in the LLM prompt, weighted by how
+# strongly each one points at a single platform. "reels" is shared by Instagram
+# and Facebook, so it leans towards Instagram like the prompt instructs.
+PLATFORM_MARKERS: Dict[str, List[Tuple[str, float]]] = {
+    "TikTok": [
+        ("tiktok", 3.0),
+        ("for you", 1.5),
+        ("tiktok shop", 1.0),
+    ],
+    "Instagram Reels": [
+        ("instagram", 2.5),
+        ("instagram reels", 1.5),
+        ("reels", 1.0),
+        ("ig reels", 2.0),
+    ],
+    "YouTube Shorts": [
+        ("youtube", 2.0),
+        ("youtube shorts", 1.5),
+        ("shorts", 1.5),
+        ("yt shorts", 2.0),
+        ("subscribers", 0.5),
+    ],
+    "Snapchat": [
+        ("snapchat", 3.0),
+        ("spotlight", 1.0),
+        ("snap map", 1.5),
+    ],
+    "Facebook Reels": [
+        ("facebook", 2.5),
+        ("facebook reels", 1.5),
+        ("fb reels", 2.0),
+        ("reels", 0.5),
+    ],
+}
+
+# Platform names. Naming an app says nothing about whether its feed is open (an
+# article, a chat or a search can mention it), so a hit also needs a UI marker:
+# a non-name marker of the platform, a feed marker or an @handle.
+PLATFORM_NAMES = ("tiktok", "instagram", "youtube", "snapchat", "facebook")
+
+# Feed UI markers that suggest a video feed but not which one. On their own
+# they make a frame ambiguous rather than a clear negative.
+GENERIC_MARKERS = ["following", "comments", "likes", "share", "follow", "sounds", "remix"]
+
+# "@username" is a pattern rather than a literal, so it is handled separately
+_HANDLE_RE = re.compile(r"(?<![\w.])@[a-z0-9_.]{2,30}")
+
+GENERIC = "__generic__"
+
+
+class AhoCorasick:
+    """Multi-pattern matcher that finds every keyword in a single pass over the text"""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pattern)
+
+        # Breadth-first pass to compute failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_words(self, text: str) -> List[str]:
+        """Return every pattern found in text that sits on word boundaries"""
+        found = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._out[state]:
+                start = index - len(pattern) + 1
+                before_ok = start == 0 or not text[start - 1].isalnum()
+                after_ok = index + 1 == len(text) or not text[index + 1].isalnum()
+                if before_ok and after_ok:
+                    found.append(pattern)
+        return found
+
+
+@dataclass
+class PrefilterResult:
+    verdict: str  # "hit", "negative" or "ambiguous"
+    platform: str
+    confidence: float
+    scores: Dict[str, float]
+    # The leading platform only matched by name, with no UI marker in the text
+    name_only: bool = False
+
+    def to_detection(self) -> Dict[str, object]:
+        """Shape the result like the LLM classifier's JSON response"""
+        detected = self.verdict == "hit"
+        return {
+            "detected": detected,
+            "platform": self.platform if detected else "none",
+            "confidence": self.confidence,
+            "source": "prefilter"
+        }
+
+
+def is_name_marker(keyword: str) -> bool:
+    """Whether a keyword names a platform ("tiktok", "instagram reels") rather than its UI"""
+    return any(name in keyword for name in PLATFORM_NAMES)
+
+
+def _build_index() -> Tuple[AhoCorasick, Dict[str, List[Tuple[str, float]]]]:
+    """Build the automaton once and map each keyword to the platforms it scores"""
+    index: Dict[str, List[Tuple[str, float]]] = {}
+    for platform, markers in PLATFORM_MARKERS.items():
+        for keyword, weight in markers:
+            index.setdefault(keyword, []).append((platform, weight))
+    for keyword in GENERIC_MARKERS:
+        index.setdefault(keyword, []).append((GENERIC, 1.0))
+    return AhoCorasick(list(index.keys())), index
+
+
+_automaton, _keyword_index = _build_index()
+
+
+def marker_score(text: str) -> float:
+    """Total weight of every platform or feed marker in text, used to rank OCR lines"""
+    lowered = text.lower()
+    score = sum(
+        weight
+        for keyword in set(_automaton.find_words(lowered))
+        for _, weight in _keyword_index[keyword]
+    )
+    if _HANDLE_RE.search(lowered):
+        score += 1.0
+    return score
+
+
+def prefilter(ocr_text: str) -> PrefilterResult:
+    """
+    Score OCR text against the platform markers without leaving the process.
+    Confident hits backed by a UI marker and texts with no markers at all are
+    decided locally; everything else, including a platform that is only named,
+    is reported as ambiguous and should go to the LLM.
+    """
+    text = ocr_text.lower()
+    scores: Dict[str, float] = {}
+    ui_markers: Dict[str, int] = {}
+
+    # Each keyword counts once so long comment threads can't inflate the score
+    for keyword in set(_automaton.find_words(text)):
+        for platform, weight in _keyword_index[keyword]:
+            scores[platform] = scores.get(platform, 0.0) + weight
+            if not is_name_marker(keyword):
+                ui_markers[platform] = ui_markers.get(platform, 0) + 1
+
+    if _HANDLE_RE.search(text):
+        scores[GENERIC] = scores.get(GENERIC, 0.0) + 1.0
+
+    generic_score = scores.pop(GENERIC, 0.0)
+
+    if not scores:
+        if generic_score:
+            return PrefilterResult("ambiguous", "none", 0.0, {GENERIC: generic_score})
+        return PrefilterResult("negative", "none", 0.9, {})
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_platform, best_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    confidence = round(best_score / (best_score + runner_up + 1.0), 3)
+    name_only = not ui_markers.get(best_platform) and not generic_score
+
+    if best_score >= PREFILTER_HIT_SCORE and confidence >= PREFILTER_MIN_CONFIDENCE and not name_only:
+        return PrefilterResult("hit", best_platform, confidence, scores)
+    return PrefilterResult("ambiguous", best_platform, confidence, scores, name_only)
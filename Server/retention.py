@@ -0,0 +1,186 @@
+import asyncio
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import aiosqlite
+
+from db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Closed sessions that started more than this many days ago leave the live table (0 keeps everything)
+SESSION_RETENTION_DAYS = int(os.getenv("SESSION_RETENTION_DAYS", "30"))
+# Seconds between retention runs
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+# Sessions archived per transaction, so the writer is never held for long
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+# Free pages returned to the filesystem per incremental vacuum step
+VACUUM_PAGES_PER_STEP = int(os.getenv("VACUUM_PAGES_PER_STEP", "2000"))
+
+ARCHIVE_COLUMNS = ("id", "platform", "start_time", "end_time", "duration", "last_seen")
+# sessions-<first id>-<last id>.jsonl.gz, with a .tmp suffix until the rows are deleted from the live table
+_ARCHIVE_NAME_RE = re.compile(r"^sessions-(\d+)-(\d+)\.jsonl\.gz(\.tmp)?$")
+
+_SELECT_EXPIRED = f'''
+SELECT {", ".join(ARCHIVE_COLUMNS)} FROM sessions
+WHERE end_time IS NOT NULL AND start_time < ?
+ORDER BY id LIMIT ?
+'''
+
+_DELETE_EXPIRED = '''
+DELETE FROM sessions
+WHERE end_time IS NOT NULL AND start_time < ? AND id BETWEEN ? AND ?
+'''
+
+
+def retention_cutoff(now: datetime.datetime, days: int = SESSION_RETENTION_DAYS) -> datetime.datetime:
+    """Midnight `days` days ago; sessions that started before it are archived"""
+    return datetime.datetime.combine(now.date() - datetime.timedelta(days=days), datetime.time.min)
+
+
+def _archive_name(first_id: int, last_id: int) -> str:
+    return f"sessions-{first_id}-{last_id}.jsonl.gz"
+
+
+def _write_archive(path: str, rows: List[Tuple[Any, ...]]) -> None:
+    """Write rows as gzip-compressed JSON lines and make sure they reached the disk"""
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(ARCHIVE_COLUMNS, row))).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+async def enable_incremental_vacuum(db: aiosqlite.Connection) -> None:
+    """
+    Switch the database to incremental auto-vacuum. Databases created before this
+    need one full VACUUM for the setting to take effect; new ones are empty, so
+    that costs nothing.
+    """
+    cursor = await db.execute("PRAGMA auto_vacuum")
+    mode = (await cursor.fetchone())[0]
+    await cursor.close()
+    if mode == 2:
+        return
+    await db.commit()
+    await db.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+    logger.info("🗄️ Enabled incremental vacuum")
+
+
+async def recover_archives(db: aiosqlite.Connection, archive_dir: str) -> None:
+    """
+    Finish or discard archive files left behind by an interrupted run. A .tmp file
+    whose first session is gone from the live table was committed and only needs
+    its final name; otherwise the delete never happened and the file is dropped.
+    """
+    if not os.path.isdir(archive_dir):
+        return
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_NAME_RE.match(name)
+        if not match or not match.group(3):
+            continue
+        first_id, last_id = int(match.group(1)), int(match.group(2))
+        cursor = await db.execute("SELECT 1 FROM sessions WHERE id = ?", (first_id,))
+        still_live = await cursor.fetchone() is not None
+        await cursor.close()
+        path = os.path.join(archive_dir, name)
+        if still_live:
+            os.remove(path)
+        else:
+            os.replace(path, os.path.join(archive_dir, _archive_name(first_id, last_id)))
+
+
+async def archive_expired_sessions(pool: ConnectionPool, archive_dir: str, cutoff: datetime.datetime) -> int:
+    """
+    Move closed sessions that started before cutoff from the live table into
+    compressed archive files. Their minutes and counts already live in the
+    rollup and platform_stats tables, which flushes keep up to date, so history
+    queries are unaffected. Returns the number of sessions archived.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff_iso = cutoff.isoformat()
+    archived = 0
+    while True:
+        async with pool.writer("retention") as db:
+            await recover_archives(db, archive_dir)
+            cursor = await db.execute(_SELECT_EXPIRED, (cutoff_iso, ARCHIVE_BATCH_SIZE))
+            rows = await cursor.fetchall()
+            if not rows:
+                return archived
+
+            first_id, last_id = rows[0][0], rows[-1][0]
+            final_path = os.path.join(archive_dir, _archive_name(first_id, last_id))
+            temp_path = final_path + ".tmp"
+            # The file must be durable before the rows it holds are deleted
+            await asyncio.to_thread(_write_archive, temp_path, rows)
+            try:
+                await db.execute(_DELETE_EXPIRED, (cutoff_iso, first_id, last_id))
+                await db.commit()
+            except Exception:
+                os.remove(temp_path)
+                raise
+            os.replace(temp_path, final_path)
+
+        archived += len(rows)
+        # Give other writers a turn between batches
+        await asyncio.sleep(0)
+
+
+async def incremental_vacuum(pool: ConnectionPool) -> int:
+    """Return free pages to the filesystem a step at a time; returns the pages freed"""
+    freed = 0
+    while True:
+        async with pool.writer("vacuum") as db:
+            cursor = await db.execute("PRAGMA freelist_count")
+            free_pages = (await cursor.fetchone())[0]
+            await cursor.close()
+            if free_pages == 0:
+                return freed
+            step = min(free_pages, VACUUM_PAGES_PER_STEP)
+            cursor = await db.execute(f"PRAGMA incremental_vacuum({int(step)})")
+            await cursor.fetchall()
+            await cursor.close()
+            await db.commit()
+        freed += step
+        await asyncio.sleep(0)
+
+
+def archive_files(archive_dir: str) -> List[str]:
+    """Completed archive files, oldest sessions first"""
+    if not os.path.isdir(archive_dir):
+        return []
+    files = []
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_NAME_RE.match(name)
+        if match and not match.group(3):
+            files.append((int(match.group(1)), name))
+    return [os.path.join(archive_dir, name) for _, name in sorted(files)]
+
+
+def iter_archived_sessions(archive_dir: str, start: Optional[datetime.datetime] = None,
+                           end: Optional[datetime.datetime] = None,
+                           platform: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream archived sessions one at a time, optionally limited to sessions that
+    started in [start, end) and to one platform. Only one line is decompressed
+    at a time, so archives of any size can be read in constant memory.
+    """
+    start_iso = start.isoformat() if start else None
+    end_iso = end.isoformat() if end else None
+    for path in archive_files(archive_dir):
+        with gzip.open(path, "rt") as archive:
+            for line in archive:
+                session = json.loads(line)
+                if start_iso and session["start_time"] < start_iso:
+                    continue
+                if end_iso and session["start_time"] >= end_iso:
+                    continue
+                if platform and session["platform"] != platform:
+                    continue
+                yield session
@@ -0,0 +1,137 @@
+import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiosqlite
+
+GRANULARITIES = ("hour", "day", "week")
+
+RollupRow = Tuple[str, str, str, int, int]
+PlatformStatRow = Tuple[str, str, int, int]
+
+
+def bucket_start(when: datetime.datetime, granularity: str) -> str:
+    """ISO timestamp of the start of the bucket containing `when`"""
+    if granularity == "hour":
+        start = when.replace(minute=0, second=0, microsecond=0)
+    elif granularity == "day":
+        start = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif granularity == "week":
+        # Weeks start on Monday
+        day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = day - datetime.timedelta(days=day.weekday())
+    else:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return start.isoformat(timespec="seconds")
+
+
+def split_minutes(start: datetime.datetime, end: datetime.datetime, minutes: int) -> List[Tuple[datetime.datetime, int]]:
+    """
+    Spread whole minutes over [start, end] in proportion to the time spent in each
+    hour it touches. Returns (time in the hour, minutes) pairs that sum to minutes.
+    """
+    if minutes <= 0:
+        return []
+    if end <= start:
+        return [(end, minutes)]
+
+    total_seconds = (end - start).total_seconds()
+    shares = []
+    allocated = 0
+    cursor = start
+    while cursor < end:
+        piece_end = min(cursor.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1), end)
+        if piece_end == end:
+            # The last piece takes whatever rounding left over
+            share = minutes - allocated
+        else:
+            share = round(minutes * (piece_end - start).total_seconds() / total_seconds) - allocated
+        if share:
+            shares.append((cursor, share))
+            allocated += share
+        cursor = piece_end
+    return shares
+
+
+def rollup_rows(platform: str, accrued_from: datetime.datetime, accrued_to: datetime.datetime,
+                minutes: int, started_at: Optional[datetime.datetime] = None) -> List[RollupRow]:
+    """
+    Increments for every granularity's buckets: minutes accrued between
+    accrued_from and accrued_to go to the buckets they accrued in, and a new
+    session (started_at given) counts once, in the bucket it started in.
+    """
+    increments: Dict[Tuple[str, str], List[int]] = {}
+    for when, share in split_minutes(accrued_from, accrued_to, minutes):
+        for granularity in GRANULARITIES:
+            increments.setdefault((granularity, bucket_start(when, granularity)), [0, 0])[0] += share
+    if started_at is not None:
+        for granularity in GRANULARITIES:
+            increments.setdefault((granularity, bucket_start(started_at, granularity)), [0, 0])[1] += 1
+    return [
+        (granularity, bucket, platform, minutes, sessions)
+        for (granularity, bucket), (minutes, sessions) in increments.items()
+    ]
+
+
+UPSERT_ROLLUP = """
+INSERT INTO usage_rollups (granularity, bucket_start, platform, minutes, sessions)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(granularity, bucket_start, platform) DO UPDATE SET
+    minutes = minutes + excluded.minutes,
+    sessions = sessions + excluded.sessions
+"""
+
+
+async def apply_rollups(db: aiosqlite.Connection, rows: List[RollupRow]) -> None:
+    """Add increments to the rollup tables (caller commits)"""
+    if rows:
+        await db.executemany(UPSERT_ROLLUP, rows)
+
+
+def platform_stat_rows(rollups: List[RollupRow]) -> List[PlatformStatRow]:
+    """Per-day increments, taken from the day buckets of rollup increments"""
+    return [
+        (bucket[:10], platform, minutes, sessions)
+        for granularity, bucket, platform, minutes, sessions in rollups
+        if granularity == "day"
+    ]
+
+
+UPSERT_PLATFORM_STATS = """
+INSERT INTO platform_stats (date, platform, minutes, sessions)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(date, platform) DO UPDATE SET
+    minutes = minutes + excluded.minutes,
+    sessions = sessions + excluded.sessions
+"""
+
+
+async def apply_platform_stats(db: aiosqlite.Connection, rows: List[PlatformStatRow]) -> None:
+    """Add increments to the per-day platform stats (caller commits)"""
+    if rows:
+        await db.executemany(UPSERT_PLATFORM_STATS, rows)
+
+
+async def query_rollups(db: aiosqlite.Connection, start: datetime.datetime, end: datetime.datetime,
+                        granularity: str, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Usage per bucket in [start, end). Only reads rollup rows, so the cost grows
+    with the number of buckets in the range rather than the number of sessions.
+    """
+    query = """
+    SELECT bucket_start, platform, minutes, sessions FROM usage_rollups
+    WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ?
+    """
+    params: List[Any] = [granularity, bucket_start(start, granularity), end.isoformat(timespec="seconds")]
+    if platform:
+        query += " AND platform = ?"
+        params.append(platform)
+    query += " ORDER BY bucket_start"
+
+    cursor = await db.execute(query, params)
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for bucket, row_platform, minutes, sessions in await cursor.fetchall():
+        entry = buckets.setdefault(bucket, {"bucket_start": bucket, "total_minutes": 0, "sessions": 0, "platforms": {}})
+        entry["platforms"][row_platform] = minutes
+        entry["total_minutes"] += minutes
+        entry["sessions"] += sessions
+    return list(buckets.values())
@@ -0,0 +1,121 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from prefilter import prefilter, GENERIC
+from usage_state import parse_timestamp
+
+# OCR items captured within this many seconds of each other are one capture of the screen
+CAPTURE_GROUP_SECONDS = float(os.getenv("CAPTURE_GROUP_SECONDS", "1"))
+# Extra weight for a detection whose app or window name names the same platform
+METADATA_MATCH_WEIGHT = float(os.getenv("METADATA_MATCH_WEIGHT", "2"))
+
+
+@dataclass
+class ScreenFrame:
+    """One OCR item: the text of a window or monitor plus what ScreenPipe knows about it"""
+    text: str
+    timestamp: Optional[str] = None
+    app_name: Optional[str] = None
+    window_name: Optional[str] = None
+    focused: Optional[bool] = None
+
+    def metadata_platforms(self) -> Set[str]:
+        """Platforms the app or window name mentions, e.g. "TikTok - Google Chrome" """
+        metadata = " ".join(name for name in (self.app_name, self.window_name) if name)
+        if not metadata:
+            return set()
+        return set(prefilter(metadata).scores) - {GENERIC}
+
+
+# A frame, the standardized platform it was classified as ("none" if nothing) and the confidence
+ClassifiedFrame = Tuple[ScreenFrame, str, float]
+
+
+def frames_from_screenpipe(payload: Dict[str, Any]) -> List[ScreenFrame]:
+    """Every item with OCR text in a ScreenPipe /search response, in payload order"""
+    frames = []
+    for item in payload.get("data", []):
+        content = item.get("content") if isinstance(item, dict) else None
+        if not isinstance(content, dict):
+            continue
+        text = (content.get("text") or "").strip()
+        if not text:
+            continue
+        frames.append(ScreenFrame(
+            text=text,
+            timestamp=content.get("timestamp"),
+            app_name=content.get("app_name"),
+            window_name=content.get("window_name"),
+            focused=content.get("focused"),
+        ))
+    return frames
+
+
+def group_captures(frames: List[ScreenFrame]) -> List[List[ScreenFrame]]:
+    """
+    Split time-ordered frames into captures: frames of different windows and
+    monitors taken at the same moment end up in the same group.
+    """
+    groups: List[List[ScreenFrame]] = []
+    group_start = None
+    for frame in frames:
+        captured = parse_timestamp(frame.timestamp)
+        if group_start is None or (captured - group_start).total_seconds() > CAPTURE_GROUP_SECONDS:
+            groups.append([])
+            group_start = captured
+        groups[-1].append(frame)
+    return groups
+
+
+def frame_weight(frame: ScreenFrame, platform: str, confidence: float) -> float:
+    """How much a detection counts towards the foreground vote"""
+    weight = confidence or 0.0
+    if platform in frame.metadata_platforms():
+        weight *= METADATA_MATCH_WEIGHT
+    return weight
+
+
+def foreground_platform(classified: List[ClassifiedFrame]) -> Optional[ClassifiedFrame]:
+    """
+    The detection usage should be attributed to for one capture. Windows ScreenPipe
+    reports as unfocused don't count, so a feed left open on another monitor isn't
+    usage; windows whose focus is unknown still do. The remaining detections vote
+    by confidence, boosted when the window metadata agrees, and the strongest frame
+    of the winning platform is returned.
+    """
+    classified = [entry for entry in classified if entry[0].focused is not False]
+
+    votes: Dict[str, float] = {}
+    best: Dict[str, Tuple[float, ClassifiedFrame]] = {}
+    for entry in classified:
+        frame, platform, confidence = entry
+        if platform == "none":
+            continue
+        weight = frame_weight(frame, platform, confidence)
+        votes[platform] = votes.get(platform, 0.0) + weight
+        if platform not in best or weight > best[platform][0]:
+            best[platform] = (weight, entry)
+
+    if not votes:
+        return None
+    # Ties go to the platform seen first, so the result doesn't depend on dict order
+    winner = max(votes, key=lambda platform: votes[platform])
+    return best[winner][1]
+
+
+def foreground_detections(classified: List[ClassifiedFrame]) -> List[ClassifiedFrame]:
+    """
+    Group classified frames into captures and return each capture's foreground
+    detection, oldest first. Both screen endpoints attribute usage through this,
+    so the same frames count the same way whether they arrive as one ScreenPipe
+    response or as a client batch.
+    """
+    ordered = sorted(classified, key=lambda entry: parse_timestamp(entry[0].timestamp))
+    by_frame = {id(entry[0]): entry for entry in ordered}
+    detections = []
+    for capture in group_captures([entry[0] for entry in ordered]):
+        foreground = foreground_platform([by_frame[id(frame)] for frame in capture])
+        if foreground:
+            detections.append(foreground)
+    return detections
@@ -0,0 +1,52 @@
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Tuple
+
+# (session_threshold, daily_threshold) as fractions of the limits
+FREQUENCY_THRESHOLDS: Dict[str, Tuple[float, float]] = {
+    "low": (0.9, 0.8),      # 90% / 80% of limit
+    "medium": (0.75, 0.6),  # 75% / 60% of limit
+    "high": (0.5, 0.4),     # 50% / 40% of limit
+}
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    """
+    Immutable copy of the user's settings with intervention thresholds precomputed.
+    Updates build a new snapshot and swap the reference, so readers never see a
+    half-applied change.
+    """
+    daily_limit_minutes: int = 60
+    session_limit_minutes: int = 15
+    intervention_frequency: str = "medium"
+    session_threshold: float = 0.75
+    daily_threshold: float = 0.6
+
+    @classmethod
+    def build(cls, daily_limit_minutes: int, session_limit_minutes: int,
+              intervention_frequency: str) -> "SettingsSnapshot":
+        # Unknown frequencies are treated as "high", like the original if/elif chain
+        session_threshold, daily_threshold = FREQUENCY_THRESHOLDS.get(
+            intervention_frequency, FREQUENCY_THRESHOLDS["high"]
+        )
+        return cls(
+            daily_limit_minutes=daily_limit_minutes,
+            session_limit_minutes=session_limit_minutes,
+            intervention_frequency=intervention_frequency,
+            session_threshold=session_threshold,
+            daily_threshold=daily_threshold
+        )
+
+    def with_updates(self, settings: Dict[str, Any]) -> "SettingsSnapshot":
+        """New snapshot with the non-None values from a settings update applied"""
+        values = {
+            key: settings[key]
+            for key in ("daily_limit_minutes", "session_limit_minutes", "intervention_frequency")
+            if settings.get(key) is not None
+        }
+        updated = replace(self, **values)
+        return SettingsSnapshot.build(
+            updated.daily_limit_minutes,
+            updated.session_limit_minutes,
+            updated.intervention_frequency
+        )
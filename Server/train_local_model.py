@@ -0,0 +1,171 @@
+"""
+Distill the logged LLM verdicts into the local classifier (faster with NumPy).
+
+    python train_local_model.py --labels labels.jsonl --output local_model.json
+
+Prints held-out accuracy and how many frames the model would answer locally
+at several margins, then trains on every label and writes the model the
+server loads from LOCAL_MODEL_PATH (reload with /admin/reload-local-model).
+"""
+import argparse
+import math
+import random
+import sys
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# NumPy vectorizes the fit; without it the same counts are taken in Python
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from classification_cache import cache_key
+from label_log import LABEL_LOG_PATH, iter_labels
+from local_model import (
+    CLASSES,
+    DEFAULT_HASH_BUCKETS,
+    LOCAL_MODEL_MIN_MARGIN,
+    LOCAL_MODEL_PATH,
+    LocalModel,
+    extract_features,
+)
+
+MIN_LABELS = 50
+REPORT_MARGINS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+# Loose platform names the LLM sometimes returns, matched like main.standardize_platform_name
+_PLATFORM_KEYWORDS = [
+    ("instagram", "Instagram Reels"),
+    ("ig reels", "Instagram Reels"),
+    ("facebook", "Facebook Reels"),
+    ("fb reels", "Facebook Reels"),
+    ("tiktok", "TikTok"),
+    ("youtube", "YouTube Shorts"),
+    ("yt shorts", "YouTube Shorts"),
+    ("snapchat", "Snapchat"),
+]
+
+
+def label_class(label: Dict) -> Optional[str]:
+    """Map a logged verdict onto one of CLASSES, or None if it names something else"""
+    platform = str(label.get("platform", "none")).lower().strip()
+    if not label.get("detected") or platform in ("", "none"):
+        return "none"
+    for keyword, name in _PLATFORM_KEYWORDS:
+        if keyword in platform:
+            return name
+    return None
+
+
+def load_dataset(path: str, min_confidence: float, buckets: int) -> List[Tuple[List[int], int]]:
+    """(features, class index) per distinct OCR text; the latest verdict for a text wins"""
+    latest: Dict[str, Tuple[List[int], int]] = {}
+    for label in iter_labels(path, min_confidence):
+        name = label_class(label)
+        if name is None:
+            continue
+        latest[cache_key(label["text"])] = (extract_features(label["text"], buckets), CLASSES.index(name))
+    return list(latest.values())
+
+
+def fit(samples: List[Tuple[List[int], int]], buckets: int, alpha: float) -> LocalModel:
+    """Multinomial naive Bayes with Laplace smoothing"""
+    if np is None:
+        return _fit_python(samples, buckets, alpha)
+
+    # Vectorized over all samples
+    classes = np.repeat([label for _, label in samples], [len(features) for features, _ in samples])
+    features = np.concatenate([np.asarray(features, dtype=np.int64) for features, _ in samples])
+    counts = np.zeros((len(CLASSES), buckets))
+    np.add.at(counts, (classes, features), 1.0)
+
+    class_counts = np.bincount([label for _, label in samples], minlength=len(CLASSES))
+    # Classes never seen in training still get a (tiny) prior so scores stay finite
+    log_prior = np.log((class_counts + alpha) / (class_counts.sum() + alpha * len(CLASSES)))
+    denominators = counts.sum(axis=1) + alpha * buckets
+    unseen = np.log(alpha / denominators)
+
+    seen = np.flatnonzero(counts.sum(axis=0))
+    weights = np.log((counts[:, seen] + alpha) / denominators[:, None]) - unseen[:, None]
+    return LocalModel(
+        list(CLASSES), buckets, log_prior.tolist(), unseen.tolist(),
+        {int(feature): weights[:, column].round(5).tolist() for column, feature in enumerate(seen)}
+    )
+
+
+def _fit_python(samples: List[Tuple[List[int], int]], buckets: int, alpha: float) -> LocalModel:
+    """The same fit as fit() with sparse per-class counts, for installs without NumPy"""
+    counts: List[Counter] = [Counter() for _ in CLASSES]
+    class_counts = [0] * len(CLASSES)
+    for features, label in samples:
+        class_counts[label] += 1
+        counts[label].update(features)
+
+    log_prior = [
+        math.log((count + alpha) / (len(samples) + alpha * len(CLASSES))) for count in class_counts
+    ]
+    denominators = [sum(class_features.values()) + alpha * buckets for class_features in counts]
+    unseen = [math.log(alpha / denominator) for denominator in denominators]
+
+    seen = sorted(set().union(*counts))
+    return LocalModel(
+        list(CLASSES), buckets, log_prior, unseen,
+        {
+            feature: [
+                round(math.log((counts[c][feature] + alpha) / denominators[c]) - unseen[c], 5)
+                for c in range(len(CLASSES))
+            ]
+            for feature in seen
+        }
+    )
+
+
+def evaluate(model: LocalModel, samples: List[Tuple[List[int], int]]) -> None:
+    """Held-out accuracy overall and for the frames each margin would keep local"""
+    predictions = []
+    for features, label in samples:
+        prediction = model.predict_features(features)
+        predictions.append((prediction.platform == CLASSES[label], prediction.margin))
+
+    accuracy = sum(correct for correct, _ in predictions) / len(predictions)
+    print(f"Held-out accuracy on {len(predictions)} labels: {accuracy:.1%}")
+    print(f"{'margin':>8} {'local share':>12} {'local accuracy':>15}")
+    for threshold in REPORT_MARGINS:
+        kept = [correct for correct, margin in predictions if margin >= threshold]
+        share = len(kept) / len(predictions)
+        local_accuracy = sum(kept) / len(kept) if kept else 0.0
+        marker = "  <- LOCAL_MODEL_MIN_MARGIN" if abs(threshold - LOCAL_MODEL_MIN_MARGIN) < 1e-9 else ""
+        print(f"{threshold:>8.1f} {share:>11.1%} {local_accuracy:>14.1%}{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local classifier from logged LLM labels")
+    parser.add_argument("--labels", default=LABEL_LOG_PATH or "labels.jsonl")
+    parser.add_argument("--output", default=LOCAL_MODEL_PATH)
+    parser.add_argument("--alpha", type=float, default=0.1, help="Laplace smoothing")
+    parser.add_argument("--buckets", type=int, default=DEFAULT_HASH_BUCKETS, help="hashed feature space size")
+    parser.add_argument("--min-confidence", type=float, default=0.5, help="skip LLM verdicts below this confidence")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of labels held out for evaluation")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    samples = load_dataset(args.labels, args.min_confidence, args.buckets)
+    if len(samples) < MIN_LABELS:
+        sys.exit(f"❌ Only {len(samples)} usable labels in {args.labels}; need at least {MIN_LABELS}")
+
+    counts = Counter(label for _, label in samples)
+    print("Labels per class: " + ", ".join(f"{name}={counts[index]}" for index, name in enumerate(CLASSES)))
+
+    if args.holdout > 0:
+        random.Random(args.seed).shuffle(samples)
+        split = int(len(samples) * (1 - args.holdout))
+        evaluate(fit(samples[:split], args.buckets, args.alpha), samples[split:])
+
+    model = fit(samples, args.buckets, args.alpha)
+    model.save(args.output)
+    print(f"💾 Saved model with {len(model.features)} features to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
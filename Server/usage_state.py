@@ -0,0 +1,165 @@
+import datetime
+import os
+from typing import Dict, Any, List, Optional
+
+from settings_snapshot import SettingsSnapshot
+
+SESSION_IDLE_GAP = float(os.getenv("SESSION_IDLE_GAP", "300"))
+
+
+def parse_timestamp(timestamp: Optional[str]) -> datetime.datetime:
+    """Parse a client/ScreenPipe timestamp into local time, falling back to now"""
+    now = datetime.datetime.now()
+    if not timestamp:
+        return now
+    try:
+        parsed = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return now
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    # Never let a skewed clock push sessions into the future
+    return min(parsed, now)
+
+
+def minutes_between(start: datetime.datetime, end: datetime.datetime) -> int:
+    """Whole minutes elapsed between two timestamps"""
+    return max(0, int((end - start).total_seconds() // 60))
+
+
+class OpenSession:
+    """A platform session that has not been closed yet"""
+
+    def __init__(self, platform: str, start_time: datetime.datetime,
+                 session_id: Optional[int] = None, flushed_duration: int = -1,
+                 last_seen: Optional[datetime.datetime] = None):
+        self.platform = platform
+        self.start_time = start_time
+        # Most recent detection; an open session only counts time up to here
+        self.last_seen = last_seen or start_time
+        # None until the write-behind flush has inserted the row
+        self.id = session_id
+        self.flushed_duration = flushed_duration
+        self.flushed_last_seen = self.last_seen if session_id is not None else None
+        self.end_time: Optional[datetime.datetime] = None
+
+    def minutes(self) -> int:
+        return minutes_between(self.start_time, self.end_time or self.last_seen)
+
+
+class UsageState:
+    """
+    In-process view of today's usage: open sessions, per-platform minutes and
+    session counts, and the user's settings. Every read is answered from memory;
+    db_manager persists changes to SQLite in the background.
+    """
+
+    def __init__(self, idle_gap: datetime.timedelta = datetime.timedelta(seconds=SESSION_IDLE_GAP)):
+        # Sessions not seen for this long are over
+        self.idle_gap = idle_gap
+        self.date = datetime.datetime.now().strftime("%Y-%m-%d")
+        self.open_sessions: Dict[str, OpenSession] = {}
+        # Minutes from sessions that were closed today
+        self.closed_minutes: Dict[str, int] = {}
+        # Sessions started today, per platform
+        self.session_counts: Dict[str, int] = {}
+        # Replaced wholesale on update, never mutated
+        self.settings = SettingsSnapshot()
+        # Sessions closed since the last flush
+        self.pending_closed: List[OpenSession] = []
+        self.dirty = False
+
+    def _roll_over(self, now: datetime.datetime) -> None:
+        """Start a fresh day of counters once the date changes"""
+        today = now.strftime("%Y-%m-%d")
+        # Only ever moves forward; closing a session at its (earlier) last-seen time mustn't rewind the day
+        if today <= self.date:
+            return
+        self.date = today
+        self.closed_minutes = {}
+        self.session_counts = {}
+        self.dirty = True
+
+    def record_detection(self, platform: str, now: datetime.datetime) -> bool:
+        """
+        Note that a platform was seen on screen.
+        Returns True when a new session was opened (a change worth flushing promptly).
+        """
+        self._roll_over(now)
+        session = self.open_sessions.get(platform)
+        if session is not None and now - session.last_seen <= self.idle_gap:
+            session.last_seen = max(session.last_seen, now)
+            self.dirty = True
+            return False
+        if session is not None:
+            # Seen again after an idle gap the reaper hasn't got to yet: that's a new session
+            self.close(platform, session.last_seen)
+
+        self.open_sessions[platform] = OpenSession(platform, now)
+        self.session_counts[platform] = self.session_counts.get(platform, 0) + 1
+        self.dirty = True
+        return True
+
+    def close(self, platform: str, now: datetime.datetime) -> Optional[OpenSession]:
+        """Close the open session for a platform, if there is one"""
+        self._roll_over(now)
+        session = self.open_sessions.pop(platform, None)
+        if session is None:
+            return None
+
+        session.end_time = max(now, session.last_seen)
+        self.closed_minutes[platform] = self.closed_minutes.get(platform, 0) + session.minutes()
+        self.pending_closed.append(session)
+        self.dirty = True
+        return session
+
+    def reap_idle(self, now: datetime.datetime) -> List[OpenSession]:
+        """Close sessions not seen for longer than the idle gap, ending them when they were last seen"""
+        idle = [s for s in self.open_sessions.values() if now - s.last_seen > self.idle_gap]
+        for session in idle:
+            self.close(session.platform, session.last_seen)
+        return idle
+
+    def current_session(self, platform: Optional[str] = None) -> Optional[OpenSession]:
+        """The open session for a platform, or the most recently started one"""
+        if platform:
+            return self.open_sessions.get(platform)
+        if not self.open_sessions:
+            return None
+        return max(self.open_sessions.values(), key=lambda s: s.start_time)
+
+    def platform_minutes(self) -> Dict[str, int]:
+        """Today's minutes per platform, including time in open sessions"""
+        platforms = {p: 0 for p in self.session_counts}
+        for platform, minutes in self.closed_minutes.items():
+            platforms[platform] = platforms.get(platform, 0) + minutes
+        for platform, session in self.open_sessions.items():
+            platforms[platform] = platforms.get(platform, 0) + session.minutes()
+        return platforms
+
+    def usage_stats(self, platform: Optional[str] = None) -> Dict[str, Any]:
+        """Usage statistics in the shape returned by db_manager.get_usage_stats"""
+        now = datetime.datetime.now()
+        self._roll_over(now)
+        platforms = self.platform_minutes()
+        session = self.current_session(platform)
+        current_session_minutes = session.minutes() if session else 0
+
+        if platform:
+            return {
+                "today_minutes": platforms.get(platform, 0),
+                "daily_goal_minutes": self.settings.daily_limit_minutes,
+                "current_session_minutes": current_session_minutes,
+                "session_goal_minutes": self.settings.session_limit_minutes,
+                "times_opened_today": self.session_counts.get(platform, 0),
+                "platform": platform
+            }
+
+        return {
+            "today_minutes": sum(platforms.values()),
+            "daily_goal_minutes": self.settings.daily_limit_minutes,
+            "current_session_minutes": current_session_minutes,
+            "session_goal_minutes": self.settings.session_limit_minutes,
+            "times_opened_today": sum(self.session_counts.values()),
+            "platforms": platforms
+        }
@@ -0,0 +1,328 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Any, Tuple, List, Optional, Iterator
+
+from db_pool import ConnectionPool
+from migrations import run_migrations
+from usage_state import UsageState, OpenSession, parse_timestamp
+from settings_snapshot import SettingsSnapshot
+from events import broker_for
+from rollups import rollup_rows, apply_rollups, platform_stat_rows, apply_platform_stats, query_rollups
+from retention import (
+    SESSION_RETENTION_DAYS,
+    RETENTION_INTERVAL,
+    retention_cutoff,
+    enable_incremental_vacuum,
+    archive_expired_sessions,
+    incremental_vacuum,
+    iter_archived_sessions,
+)
+
+logger = logging.getLogger(__name__)
+
+# In-memory usage state; SQLite is only written by the background flusher
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "30"))
+
+
+class UsageStore:
+    """
+    One tenant's usage data: its database file and connection pool, the in-memory
+    usage state every read is answered from, the background task that flushes
+    that state to SQLite and closes idle sessions, and the one that archives old
+    sessions out of the live table.
+    """
+
+    def __init__(self, tenant_id: str, path: str, readers: int, archive_dir: str):
+        self.tenant_id = tenant_id
+        self.path = path
+        self.archive_dir = archive_dir
+        self.pool = ConnectionPool(path, readers)
+        self.state = UsageState()
+        self.broker = broker_for(tenant_id)
+        # Requests currently using this store; only idle stores are evicted
+        self.active = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_wakeup = asyncio.Event()
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._maintenance_stop = asyncio.Event()
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+    async def open(self) -> None:
+        """Open the connection pool, bring the schema up to date and load usage state"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        await self.pool.open()
+        async with self.pool.writer("migrate") as db:
+            await run_migrations(db)
+            await enable_incremental_vacuum(db)
+        await self.load_state()
+        # Created here so they belong to the running event loop
+        self._flush_lock = asyncio.Lock()
+        self._flush_wakeup = asyncio.Event()
+        self._flusher_task = asyncio.create_task(self._flush_loop())
+        self._maintenance_stop = asyncio.Event()
+        if SESSION_RETENTION_DAYS > 0:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def close(self) -> None:
+        """Flush pending usage changes and close the connection pool"""
+        if self._maintenance_task is not None:
+            # Let a retention pass in progress finish rather than cancelling it mid-batch
+            self._maintenance_stop.set()
+            await self._maintenance_task
+            self._maintenance_task = None
+        if self._flusher_task is not None:
+            # Let the flusher finish its final flush rather than cancelling it mid-write
+            self._stopping = True
+            self.request_flush()
+            await self._flusher_task
+            self._flusher_task = None
+            self._stopping = False
+        await self.pool.close()
+
+    async def reset(self) -> None:
+        """Delete this tenant's database file (its WAL side files and archives) and start fresh"""
+        await self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+        await self.open()
+
+    async def load_state(self) -> None:
+        """Rebuild the in-memory usage state from the database"""
+        now = datetime.datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        tomorrow = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        new_state = UsageState()
+        new_state.date = today
+
+        async with self.pool.reader("load_usage_state") as db:
+            cursor = await db.execute(
+                "SELECT daily_limit_minutes, session_limit_minutes, intervention_frequency FROM settings WHERE id = 1"
+            )
+            row = await cursor.fetchone()
+            if row:
+                new_state.settings = SettingsSnapshot.build(*row)
+
+            # Open sessions (served by the partial open-session index)
+            cursor = await db.execute(
+                "SELECT id, platform, start_time, duration, last_seen FROM sessions WHERE end_time IS NULL ORDER BY start_time"
+            )
+            for session_id, platform, start_time, duration, last_seen in await cursor.fetchall():
+                # Later rows win if a platform somehow has more than one open session
+                new_state.open_sessions[platform] = OpenSession(
+                    platform, datetime.datetime.fromisoformat(start_time), session_id, duration or 0,
+                    datetime.datetime.fromisoformat(last_seen) if last_seen else None
+                )
+
+            # Sessions started today and minutes from the ones already closed
+            cursor = await db.execute(
+                """SELECT platform, COUNT(*), SUM(CASE WHEN end_time IS NOT NULL THEN duration ELSE 0 END)
+                   FROM sessions WHERE start_time >= ? AND start_time < ? GROUP BY platform""",
+                (today, tomorrow)
+            )
+            for platform, count, closed_minutes in await cursor.fetchall():
+                new_state.session_counts[platform] = count
+                if closed_minutes:
+                    new_state.closed_minutes[platform] = int(closed_minutes)
+
+        self.state = new_state
+
+    async def flush(self) -> None:
+        """Write pending usage changes to SQLite in a single transaction"""
+        async with self._flush_lock:
+            state = self.state
+            if not state.dirty and not state.pending_closed:
+                return
+
+            # Snapshot what needs writing; state keeps changing while we await
+            state.dirty = False
+            open_sessions = list(state.open_sessions.values())
+            closed_sessions = state.pending_closed
+            state.pending_closed = []
+
+            try:
+                async with self.pool.writer("flush") as db:
+                    rollups = []
+                    day_stats = []
+                    flushed = []
+                    for session in open_sessions + closed_sessions:
+                        duration = session.minutes()
+                        end_time = session.end_time.isoformat() if session.end_time else None
+                        last_seen = session.last_seen.isoformat()
+
+                        # Minutes accrued since the last flush are spread over the time since the
+                        # last flushed detection; a new session counts where it started
+                        is_new = session.id is None
+                        accrued = max(duration - max(session.flushed_duration, 0), 0)
+                        if is_new or accrued > 0:
+                            session_rollups = rollup_rows(
+                                session.platform,
+                                session.flushed_last_seen or session.start_time,
+                                session.end_time or session.last_seen,
+                                accrued,
+                                session.start_time if is_new else None
+                            )
+                            rollups.extend(session_rollups)
+                            day_stats.extend(platform_stat_rows(session_rollups))
+
+                        session_id = session.id
+                        if session_id is None:
+                            cursor = await db.execute(
+                                "INSERT INTO sessions (platform, start_time, end_time, duration, last_seen) VALUES (?, ?, ?, ?, ?)",
+                                (session.platform, session.start_time.isoformat(), end_time, duration, last_seen)
+                            )
+                            session_id = cursor.lastrowid
+                        elif end_time or duration != session.flushed_duration or session.last_seen != session.flushed_last_seen:
+                            await db.execute(
+                                "UPDATE sessions SET end_time = ?, duration = ?, last_seen = ? WHERE id = ?",
+                                (end_time, duration, last_seen, session.id)
+                            )
+                        flushed.append((session, session_id, duration, session.last_seen))
+
+                    await apply_rollups(db, rollups)
+                    await apply_platform_stats(db, day_stats)
+
+                    await db.commit()
+
+                # Only once committed, so a failed flush re-sends the same increments
+                for session, session_id, duration, last_seen in flushed:
+                    session.id = session_id
+                    session.flushed_duration = duration
+                    session.flushed_last_seen = last_seen
+            except Exception:
+                # Put the work back so the next flush retries it
+                state.pending_closed = closed_sessions + state.pending_closed
+                state.dirty = True
+                raise
+
+    async def _flush_loop(self) -> None:
+        """Flush usage state every USAGE_FLUSH_INTERVAL seconds, or sooner on significant changes"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=USAGE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            self.reap_idle_sessions()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Error flushing usage state for tenant {self.tenant_id}: {e}")
+            if self._stopping:
+                return
+
+    def reap_idle_sessions(self) -> List[OpenSession]:
+        """
+        Close sessions whose last detection is older than the idle gap. They end at
+        their last detection, so time after the user stopped scrolling isn't counted.
+        """
+        reaped = self.state.reap_idle(datetime.datetime.now())
+        if reaped:
+            logger.info(f"💤 Closed idle sessions for tenant {self.tenant_id}: {', '.join(s.platform for s in reaped)}")
+            self.broker.publish("usage", self.state.usage_stats())
+        return reaped
+
+    async def run_retention(self) -> Dict[str, int]:
+        """Archive closed sessions older than the retention window, then give the freed space back"""
+        # Sessions must be flushed (and closed) before they can be archived
+        await self.flush()
+        archived = await archive_expired_sessions(
+            self.pool, self.archive_dir, retention_cutoff(datetime.datetime.now())
+        )
+        freed_pages = await incremental_vacuum(self.pool)
+        if archived or freed_pages:
+            logger.info(f"🗃️ Archived {archived} sessions and freed {freed_pages} pages for tenant {self.tenant_id}")
+        return {"archived_sessions": archived, "freed_pages": freed_pages}
+
+    async def _maintenance_loop(self) -> None:
+        """Run retention at startup and every RETENTION_INTERVAL seconds until the store closes"""
+        while not self._maintenance_stop.is_set():
+            try:
+                await self.run_retention()
+            except Exception as e:
+                logger.error(f"❌ Error running retention for tenant {self.tenant_id}: {e}")
+            try:
+                await asyncio.wait_for(self._maintenance_stop.wait(), timeout=RETENTION_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def archived_sessions(self, start: Optional[datetime.datetime] = None,
+                          end: Optional[datetime.datetime] = None,
+                          platform: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream sessions that have been moved out of the live table"""
+        return iter_archived_sessions(self.archive_dir, start, end, platform)
+
+    def request_flush(self) -> None:
+        """Ask the background flusher to persist state now instead of waiting for the timer"""
+        self._flush_wakeup.set()
+
+    def record_session(self, platform: str, timestamp: Optional[str]) -> None:
+        """Record or update a platform usage session"""
+        if self.state.record_detection(platform, parse_timestamp(timestamp)):
+            # A new session is a significant change, persist it promptly
+            self.request_flush()
+
+    def record_sessions(self, detections: List[Tuple[str, str]]) -> None:
+        """Record many (platform, timestamp) detections; the flusher persists them together"""
+        started = False
+        for platform, timestamp in detections:
+            started |= self.state.record_detection(platform, parse_timestamp(timestamp))
+        if started:
+            self.request_flush()
+
+    def close_session(self, platform: str) -> None:
+        """Close an open session for a platform"""
+        if self.state.close(platform, datetime.datetime.now()):
+            self.request_flush()
+
+    async def usage_history(self, start: datetime.datetime, end: datetime.datetime,
+                            granularity: str, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Usage per hour/day/week bucket between start and end, from the rollup tables"""
+        # Pending minutes only reach the rollups on flush (a no-op when nothing changed)
+        await self.flush()
+        async with self.pool.reader("usage_history") as db:
+            return await query_rollups(db, start, end, granularity, platform)
+
+    async def update_settings(self, settings: Dict[str, Any]) -> None:
+        """Update user preferences and settings"""
+        async with self.pool.writer("update_settings") as db:
+            # Extract specific settings
+            daily_limit = settings.get("daily_limit_minutes")
+            session_limit = settings.get("session_limit_minutes")
+            frequency = settings.get("intervention_frequency")
+
+            update_fields = []
+            update_values = []
+
+            if daily_limit is not None:
+                update_fields.append("daily_limit_minutes = ?")
+                update_values.append(daily_limit)
+
+            if session_limit is not None:
+                update_fields.append("session_limit_minutes = ?")
+                update_values.append(session_limit)
+
+            if frequency is not None:
+                update_fields.append("intervention_frequency = ?")
+                update_values.append(frequency)
+
+            # Store all settings as JSON for future extensibility
+            update_fields.append("settings_json = ?")
+            update_values.append(json.dumps(settings))
+
+            # Update settings
+            if update_fields:
+                query = f"UPDATE settings SET {', '.join(update_fields)} WHERE id = 1"
+                await db.execute(query, update_values)
+                await db.commit()
+
+        # Swap in a new snapshot for the decision path
+        self.state.settings = self.state.settings.with_updates(settings)
@@ -0,0 +1,68 @@
+"""
+Compare two benchmark result files.
+
+    python bench/compare.py bench/results/load-before.json bench/results/load-after.json
+"""
+import argparse
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+from results import load_results
+
+# Metrics where a higher number is better; every other *_ms metric is a latency
+HIGHER_IS_BETTER = {"throughput_rps"}
+COMPARED_METRICS = ("throughput_rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms")
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, str, float]]:
+    """Yield (measurement path, metric, value) for every compared metric"""
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}/")
+        elif key in COMPARED_METRICS and isinstance(value, (int, float)):
+            yield prefix.rstrip("/"), key, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent change that counts as a regression (default: 10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on any regression")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    if baseline.get("kind") != candidate.get("kind"):
+        sys.exit(f"❌ Cannot compare a {baseline.get('kind')} result with a {candidate.get('kind')} result")
+
+    before = {(path, metric): value for path, metric, value in flatten(baseline["results"])}
+    after = {(path, metric): value for path, metric, value in flatten(candidate["results"])}
+
+    regressions = 0
+    print(f"{'measurement':<40} {'metric':<15} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for key in sorted(before.keys() & after.keys()):
+        path, metric = key
+        old, new = before[key], after[key]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > args.threshold:
+            flag = " ⚠️"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = " ✅"
+        print(f"{path:<40} {metric:<15} {old:>12.2f} {new:>12.2f} {change:>+8.1f}%{flag}")
+
+    missing = sorted({path for path, _ in before.keys() ^ after.keys()})
+    if missing:
+        print(f"\nOnly in one file: {', '.join(missing)}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0f}%")
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
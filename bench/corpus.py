@@ -0,0 +1,78 @@
+import random
+from typing import Dict, List
+
+# Screen text templates per label. {user}, {n} and {word} are filled per frame so
+# repeated templates still produce distinct OCR text, like a real scrolling feed.
+PLATFORM_TEMPLATES: Dict[str, List[str]] = {
+    "TikTok": [
+        "For You  Following  @{user}  {n} likes  {n} comments  Share  TikTok",
+        "TikTok  LIVE  @{user}  original sound - {user}  {n}K  Following",
+        "@{user}  #fyp #{word}  {n} comments  Add comment...  For You",
+    ],
+    "Instagram Reels": [
+        "Instagram  Reels  @{user}  {n} likes  View all {n} comments",
+        "Reels  {user}  Follow  Original audio  {n}K  Instagram",
+        "Instagram Reels  Liked by {user} and {n} others  #{word}",
+    ],
+    "YouTube Shorts": [
+        "YouTube  Shorts  @{user}  Subscribe  {n}K  Comments {n}",
+        "Shorts  {user}  {n}M subscribers  Remix  Share  YouTube",
+    ],
+    "Facebook Reels": [
+        "Facebook  Reels  {user}  Follow  {n} reactions  {n} shares",
+        "FB Reels  {user} is live  Like  Comment  Share  {n}K views",
+    ],
+    "Snapchat": [
+        "Snapchat  Spotlight  {user}  {n}K views  Send to Chat",
+        "Snapchat  Stories  {user}  {n}m ago  Discover",
+    ],
+}
+
+NEGATIVE_TEMPLATES: List[str] = [
+    "def {word}_handler(request):  return response  # line {n}",
+    "Quarterly budget  Q{n}  Revenue  Expenses  Total  {word}",
+    "Inbox ({n})  Re: {word} meeting notes  From: {user}",
+    "Terminal  $ git status  On branch {word}  {n} files changed",
+    "Google Docs  {word} draft  Last edit was {n} minutes ago",
+    "Slack  #{word}  {user}: can you review PR {n}?",
+]
+
+# Frames with weak or mixed signals that the keyword prefilter leaves to the LLM
+AMBIGUOUS_TEMPLATES: List[str] = [
+    "@{user} commented on your post  {n} new notifications",
+    "Watch more  {n} views  {user}  #{word}",
+    "{user} shared a video  {n} likes  Reply",
+    "Trending  #{word}  {n} posts  See more",
+]
+
+WORDS = ["travel", "cooking", "cats", "football", "release", "design", "budget", "music", "ai", "gym"]
+USERS = ["alex", "sam_k", "jordan.r", "mia", "devon22", "kai", "rowan", "lee_m"]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(user=rng.choice(USERS), n=rng.randint(1, 999), word=rng.choice(WORDS))
+
+
+def generate_frames(count: int, seed: int = 0, platform_ratio: float = 0.5,
+                    ambiguous_ratio: float = 0.2) -> List[Dict[str, str]]:
+    """
+    Deterministic list of synthetic OCR frames: {"text", "label"}.
+    label is the platform the frame was generated from, "none" for negatives
+    and "ambiguous" for frames without a clear answer.
+    """
+    rng = random.Random(seed)
+    platforms = list(PLATFORM_TEMPLATES)
+    frames = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < platform_ratio:
+            label = rng.choice(platforms)
+            text = _fill(rng.choice(PLATFORM_TEMPLATES[label]), rng)
+        elif roll < platform_ratio + ambiguous_ratio:
+            label = "ambiguous"
+            text = _fill(rng.choice(AMBIGUOUS_TEMPLATES), rng)
+        else:
+            label = "none"
+            text = _fill(rng.choice(NEGATIVE_TEMPLATES), rng)
+        frames.append({"text": text, "label": label})
+    return frames
@@ -0,0 +1,160 @@
+"""
+Microbenchmarks for the database layer at different session table sizes.
+
+    python bench/db_bench.py --rows 10000 1000000 --iterations 1000
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(os.path.dirname(BENCH_DIR), "Server")
+
+# db_manager reads these at import time; keep the background flusher out of the measurements
+WORKDIR = tempfile.mkdtemp(prefix="screenbreak-dbbench-")
+os.environ["DB_PATH"] = os.path.join(WORKDIR, "bench.db")
+os.environ["TENANT_DB_DIR"] = os.path.join(WORKDIR, "tenants")
+os.environ["ARCHIVE_DIR"] = os.path.join(WORKDIR, "archive")
+os.environ.setdefault("USAGE_FLUSH_INTERVAL", "3600")
+# Seeded history goes back further than the retention window; keep it in the live table
+os.environ.setdefault("SESSION_RETENTION_DAYS", "0")
+sys.path.insert(0, SERVER_DIR)
+
+import db_manager  # noqa: E402
+from results import save_results, summarize, print_table  # noqa: E402
+
+PLATFORMS = ["TikTok", "Instagram Reels", "YouTube Shorts", "Facebook Reels", "Snapchat"]
+
+
+def remove_database(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def seed_sessions(path: str, rows: int, days: int, seed: int) -> None:
+    """Fill a fresh database with closed sessions spread over the last `days` days"""
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    span = days * 24 * 3600
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        platform TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        duration INTEGER DEFAULT 0
+    )
+    ''')
+
+    def generate():
+        for _ in range(rows):
+            start = now - datetime.timedelta(seconds=rng.randint(3600, span))
+            duration = rng.randint(0, 30)
+            end = start + datetime.timedelta(minutes=duration)
+            yield rng.choice(PLATFORMS), start.isoformat(), end.isoformat(), duration
+
+    conn.executemany("INSERT INTO sessions (platform, start_time, end_time, duration) VALUES (?, ?, ?, ?)", generate())
+    conn.commit()
+    conn.close()
+
+
+async def measure(iterations: int, operation: Callable[[int], Awaitable[Any]]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        op_started = time.perf_counter()
+        await operation(i)
+        latencies.append((time.perf_counter() - op_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def bench_size(rows: int, iterations: int, days: int, seed: int) -> Dict[str, Any]:
+    path = db_manager.DB_PATH
+    remove_database(path)
+
+    seed_started = time.perf_counter()
+    seed_sessions(path, rows, days, seed)
+    seed_seconds = time.perf_counter() - seed_started
+
+    # First open runs every migration, including the rollup and stats backfills
+    open_started = time.perf_counter()
+    await db_manager.init_db()
+    open_seconds = time.perf_counter() - open_started
+
+    results: Dict[str, Any] = {}
+    try:
+        now = datetime.datetime.now()
+
+        async def record(i: int):
+            await db_manager.record_session(PLATFORMS[i % len(PLATFORMS)], now.isoformat())
+
+        async def usage_stats(i: int):
+            await db_manager.get_usage_stats(PLATFORMS[i % len(PLATFORMS)])
+
+        async def record_and_flush(i: int):
+            await db_manager.record_session(PLATFORMS[i % len(PLATFORMS)], now.isoformat())
+            await db_manager.flush_usage_state()
+
+        async def close_and_flush(i: int):
+            platform = PLATFORMS[i % len(PLATFORMS)]
+            await db_manager.record_session(platform, now.isoformat())
+            await db_manager.close_session(platform)
+            await db_manager.flush_usage_state()
+
+        async def history(i: int):
+            await db_manager.get_usage_history(now - datetime.timedelta(days=30), now, "day")
+
+        async def load_state(i: int):
+            await db_manager.load_usage_state()
+
+        results["record_session"] = await measure(iterations, record)
+        results["get_usage_stats"] = await measure(iterations, usage_stats)
+        results["record_session+flush"] = await measure(iterations, record_and_flush)
+        results["close_session+flush"] = await measure(iterations, close_and_flush)
+        results["get_usage_history_30d"] = await measure(max(1, iterations // 10), history)
+        results["load_usage_state"] = await measure(max(1, iterations // 100), load_state)
+    finally:
+        await db_manager.close_db()
+
+    print(f"\n📊 {rows:,} sessions (seeded in {seed_seconds:.1f}s, opened and migrated in {open_seconds:.2f}s)")
+    print_table(results)
+    return {"seed_seconds": round(seed_seconds, 3), "open_seconds": round(open_seconds, 3), "operations": results}
+
+
+async def run(args) -> Dict[str, Any]:
+    return {
+        str(rows): await bench_size(rows, args.iterations, args.days, args.seed)
+        for rows in args.rows
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ScreenBreak database microbenchmarks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000],
+                        help="session table sizes to benchmark")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365, help="how far back seeded sessions go")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="result file (default: bench/results/db-<time>.json)")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        remove_database(db_manager.DB_PATH)
+
+    path = save_results("db", vars(args), results, args.output)
+    print(f"\n💾 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Stand-in for the Groq chat completions API, for benchmarks and offline development.
+
+    python bench/fake_groq.py --port 8100 --latency-ms 300 --jitter-ms 100
+    GROQ_BASE_URL=http://127.0.0.1:8100 GROQ_API_KEY=bench uvicorn main:app
+
+Classification answers are a deterministic function of the OCR text, so repeated
+frames get the same label (and the backend's cache behaves as it would in production).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+config: Dict[str, Any] = {
+    "latency_ms": 300.0,
+    "jitter_ms": 100.0,
+    "error_rate": 0.0,
+}
+
+DEFAULT_LABELS = "TikTok=1,Instagram Reels=1,YouTube Shorts=1,none=2"
+
+_OCR_TEXT_RE = re.compile(r'\*\*OCR TEXT TO ANALYZE:\*\*\s*"(.*)"', re.DOTALL)
+_VARIANT_COUNT_RE = re.compile(r"Create (\d+) different")
+
+
+def parse_labels(spec: str) -> List[Tuple[str, float]]:
+    """'TikTok=2,none=1' -> cumulative weights [("TikTok", 2.0), ("none", 3.0)]"""
+    labels = []
+    total = 0.0
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            total += float(weight or 1)
+            labels.append((name.strip(), total))
+    return labels
+
+
+# (label, cumulative weight) pairs; "none" means no platform detected
+config["labels"] = parse_labels(DEFAULT_LABELS)
+
+
+def label_for(text: str) -> Tuple[str, float]:
+    """Pick a label and confidence from a hash of the text"""
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    labels = config["labels"]
+    point = int.from_bytes(digest[:4], "big") / 2 ** 32 * labels[-1][1]
+    label = next(name for name, cumulative in labels if point < cumulative)
+    confidence = 0.6 + (digest[4] / 255) * 0.39
+    return label, round(confidence, 2)
+
+
+def completion(content: str, prompt: str) -> Dict[str, Any]:
+    """OpenAI-compatible chat completion body"""
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-{random.getrandbits(64):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake-llama",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+
+    delay = max(0.0, random.gauss(config["latency_ms"], config["jitter_ms"])) / 1000
+    await asyncio.sleep(delay)
+
+    if random.random() < config["error_rate"]:
+        return JSONResponse(status_code=500, content={"error": {"message": "fake upstream error"}})
+
+    ocr_match = _OCR_TEXT_RE.search(prompt)
+    variant_match = _VARIANT_COUNT_RE.search(prompt)
+    if ocr_match:
+        label, confidence = label_for(ocr_match.group(1))
+        detected = label != "none"
+        content = json.dumps({"detected": detected, "platform": label, "confidence": confidence})
+    elif variant_match:
+        count = int(variant_match.group(1))
+        content = json.dumps({"messages": [
+            f"Fake reminder {i + 1}: you've been scrolling a while, maybe stretch for a minute?"
+            for i in range(count)
+        ]})
+    else:
+        content = "You've been scrolling for a while. How about a short walk?"
+
+    return completion(content, prompt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--labels", default=DEFAULT_LABELS,
+                        help="weighted classification labels, e.g. 'TikTok=2,none=1'")
+    args = parser.parse_args()
+
+    config.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        labels=parse_labels(args.labels),
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Stand-in for ScreenPipe's /search endpoint that "captures" a synthetic frame every
+--frame-interval seconds, for running the client against without a real screen.
+
+    python bench/fake_screenpipe.py --port 3031 --frame-interval 2
+    SCREENPIPE_URL=http://127.0.0.1:3031 python Client/main.py
+"""
+import argparse
+import datetime
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+from corpus import generate_frames
+
+app = FastAPI()
+
+config: Dict[str, Any] = {
+    "frame_interval": 2.0,
+    "frames": generate_frames(500),
+    "started_at": time.time(),
+}
+
+APP_NAMES = {
+    "TikTok": "Google Chrome",
+    "Instagram Reels": "Safari",
+    "YouTube Shorts": "Google Chrome",
+    "Facebook Reels": "Firefox",
+    "Snapchat": "Google Chrome",
+    "ambiguous": "Google Chrome",
+    "none": "Code",
+}
+
+
+def frame_item(index: int) -> Dict[str, Any]:
+    """ScreenPipe OCR search item for the index-th captured frame"""
+    frame = config["frames"][index % len(config["frames"])]
+    captured = datetime.datetime.fromtimestamp(
+        config["started_at"] + index * config["frame_interval"], tz=datetime.timezone.utc
+    )
+    return {
+        "type": "OCR",
+        "content": {
+            "frame_id": index,
+            "text": frame["text"],
+            "timestamp": captured.isoformat().replace("+00:00", "Z"),
+            "app_name": APP_NAMES.get(frame["label"], "Google Chrome"),
+            "window_name": frame["text"][:40],
+            "focused": True,
+        },
+    }
+
+
+@app.get("/search")
+async def search(limit: int = 20, offset: int = 0, content_type: str = "ocr",
+                 start_time: Optional[str] = None) -> Dict[str, Any]:
+    """Newest frames first, optionally only those captured after start_time"""
+    latest = int((time.time() - config["started_at"]) // config["frame_interval"])
+    first = 0
+    if start_time:
+        since = datetime.datetime.fromisoformat(start_time.replace("Z", "+00:00")).timestamp()
+        first = max(0, int((since - config["started_at"]) // config["frame_interval"]))
+
+    indexes = range(latest - offset, max(first, latest - offset - limit + 1) - 1, -1)
+    items: List[Dict[str, Any]] = [frame_item(i) for i in indexes if i >= 0]
+    return {"data": items, "pagination": {"limit": limit, "offset": offset, "total": latest + 1}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake ScreenPipe /search server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3031)
+    parser.add_argument("--frame-interval", type=float, default=2.0, help="seconds between captured frames")
+    parser.add_argument("--corpus-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config.update(
+        frame_interval=args.frame_interval,
+        frames=generate_frames(args.corpus_size, seed=args.seed),
+        started_at=time.time(),
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
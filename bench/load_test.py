@@ -0,0 +1,223 @@
+"""
+Drive the backend at a fixed concurrency and report throughput and latency percentiles.
+
+    # Everything local: starts the fake Groq server and a backend on a scratch database
+    python bench/load_test.py --spawn --concurrency 16 --requests 2000
+
+    # Against an already running backend
+    python bench/load_test.py --backend http://localhost:8000 --duration 30
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from corpus import generate_frames
+from results import save_results, summarize, print_table
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(os.path.dirname(BENCH_DIR), "Server")
+
+DEFAULT_MIX = "process_screen=8,usage_stats=1,check_intervention=1"
+ENDPOINTS = ("process_screen", "process_screen_batch", "usage_stats", "check_intervention")
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """'process_screen=8,usage_stats=1' -> [("process_screen", 8.0), ("usage_stats", 1.0)]"""
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (expected one of {', '.join(ENDPOINTS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+class LoadTest:
+    def __init__(self, backend: str, mix: List[Tuple[str, float]], frames: List[Dict[str, str]],
+                 concurrency: int, total_requests: Optional[int], duration: Optional[float],
+                 batch_size: int, seed: int):
+        self.backend = backend.rstrip("/")
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.frames = frames
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.duration = duration
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.frame_cycle = itertools.cycle(frames)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.names}
+        self.errors: Dict[str, int] = {name: 0 for name in self.names}
+        self.issued = 0
+
+    def _next_request(self) -> Optional[str]:
+        if self.total_requests is not None and self.issued >= self.total_requests:
+            return None
+        self.issued += 1
+        return self.rng.choices(self.names, weights=self.weights)[0]
+
+    async def _send(self, client: httpx.AsyncClient, name: str) -> httpx.Response:
+        if name == "process_screen":
+            frame = next(self.frame_cycle)
+            return await client.post("/process_screen", json={
+                "data": [{"type": "OCR", "content": {"text": frame["text"]}}]
+            })
+        if name == "process_screen_batch":
+            frames = [{"text": next(self.frame_cycle)["text"]} for _ in range(self.batch_size)]
+            return await client.post("/process_screen_batch", json={"frames": frames})
+        return await client.get(f"/{name}")
+
+    async def _worker(self, client: httpx.AsyncClient, deadline: Optional[float], record: bool) -> None:
+        while deadline is None or time.perf_counter() < deadline:
+            name = self._next_request()
+            if name is None:
+                return
+            started = time.perf_counter()
+            try:
+                response = await self._send(client, name)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if not record:
+                continue
+            if ok:
+                self.latencies[name].append(elapsed_ms)
+            else:
+                self.errors[name] += 1
+
+    async def run(self, warmup: int) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.backend, limits=limits, timeout=60) as client:
+            if warmup:
+                total, self.total_requests = self.total_requests, warmup
+                await asyncio.gather(*(self._worker(client, None, record=False) for _ in range(self.concurrency)))
+                self.total_requests, self.issued = total, 0
+
+            started = time.perf_counter()
+            deadline = started + self.duration if self.duration else None
+            await asyncio.gather(*(self._worker(client, deadline, record=True) for _ in range(self.concurrency)))
+            elapsed = time.perf_counter() - started
+
+        results = {
+            name: summarize(self.latencies[name], elapsed, self.errors[name])
+            for name in self.names
+        }
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        results["overall"] = summarize(all_latencies, elapsed, sum(self.errors.values()))
+        return results
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def spawn_stack(args, workdir: str) -> List[subprocess.Popen]:
+    """Start the fake Groq server and a backend that talks to it on a scratch database"""
+    groq_url = f"http://127.0.0.1:{args.groq_port}"
+    fake_groq = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "fake_groq.py"),
+        "--port", str(args.groq_port),
+        "--latency-ms", str(args.llm_latency_ms),
+        "--jitter-ms", str(args.llm_jitter_ms),
+        "--error-rate", str(args.llm_error_rate),
+    ])
+    env = {
+        **os.environ,
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": groq_url,
+        "DB_PATH": os.path.join(workdir, "bench.db"),
+        "CLASSIFICATION_CACHE_DB": "",
+        # Everything the backend writes or loads lives in the scratch directory, not Server/
+        "TENANT_DB_DIR": os.path.join(workdir, "tenants"),
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "LOCAL_MODEL_PATH": os.path.join(workdir, "local_model.json"),
+        "LABEL_LOG_PATH": "",
+    }
+    # The backend logs every request; keep that out of the report
+    log = open(os.path.join(workdir, "backend.log"), "w")
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.backend_port), "--log-level", "warning"],
+        cwd=SERVER_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    processes = [fake_groq, backend]
+    try:
+        wait_until_up(groq_url)
+        wait_until_up(f"http://127.0.0.1:{args.backend_port}/usage_stats")
+    except Exception:
+        for process in processes:
+            process.terminate()
+        raise
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ScreenBreak backend load test")
+    parser.add_argument("--backend", default=None, help="backend URL (default: the spawned one)")
+    parser.add_argument("--spawn", action="store_true", help="start the fake Groq server and a scratch backend")
+    parser.add_argument("--backend-port", type=int, default=8010)
+    parser.add_argument("--groq-port", type=int, default=8100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="run for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=50, help="unrecorded requests sent first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted endpoint mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--batch-size", type=int, default=10, help="frames per process_screen_batch request")
+    parser.add_argument("--corpus-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="result file (default: bench/results/load-<time>.json)")
+    args = parser.parse_args()
+
+    if not args.spawn and not args.backend:
+        args.backend = "http://localhost:8000"
+
+    processes: List[subprocess.Popen] = []
+    workdir = tempfile.mkdtemp(prefix="screenbreak-bench-")
+    try:
+        if args.spawn:
+            processes = spawn_stack(args, workdir)
+            args.backend = args.backend or f"http://127.0.0.1:{args.backend_port}"
+
+        test = LoadTest(
+            backend=args.backend,
+            mix=parse_mix(args.mix),
+            frames=generate_frames(args.corpus_size, seed=args.seed),
+            concurrency=args.concurrency,
+            total_requests=None if args.duration else args.requests,
+            duration=args.duration,
+            batch_size=args.batch_size,
+            seed=args.seed,
+        )
+        results = asyncio.run(test.run(args.warmup))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    print_table(results)
+    path = save_results("load", {key: value for key, value in vars(args).items()}, results, args.output)
+    print(f"\n💾 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
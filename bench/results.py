@@ -0,0 +1,72 @@
+import datetime
+import json
+import math
+import os
+import platform
+import sys
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_ms: List[float], elapsed_seconds: Optional[float] = None, errors: int = 0) -> Dict[str, Any]:
+    """Count, throughput and latency percentiles (milliseconds) for one measurement"""
+    values = sorted(latencies_ms)
+    summary: Dict[str, Any] = {
+        "count": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+    if elapsed_seconds:
+        summary["throughput_rps"] = round(len(values) / elapsed_seconds, 2)
+    return summary
+
+
+def save_results(kind: str, config: Dict[str, Any], results: Dict[str, Any],
+                 output: Optional[str] = None) -> str:
+    """Write a result file and return its path"""
+    now = datetime.datetime.now()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{now.strftime('%Y%m%d-%H%M%S')}.json")
+    document = {
+        "kind": kind,
+        "created_at": now.isoformat(timespec="seconds"),
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "config": config,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    """Print one line per measurement"""
+    print(f"{'name':<32} {'count':>8} {'rps':>10} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for name, summary in results.items():
+        rps = summary.get("throughput_rps")
+        print(
+            f"{name:<32} {summary['count']:>8} {rps if rps is not None else '-':>10} "
+            f"{summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} {summary['errors']:>7}"
+        )
@@ -5,9 +5,10 @@ const InterventionContext = createContext();
 
 export function InterventionProvider({ children }) {
   const [intervention, setIntervention] = useState(null);
+  const [usageStats, setUsageStats] = useState(null);
   const BACKEND_URL = 'http://localhost:8000';
 
-  // Poll for interventions
+  // Listen for pushed interventions and usage updates
   useEffect(() => {
     const checkForInterventions = async () => {
       try {
@@ -22,11 +23,23 @@ export function InterventionProvider({ children }) {
       }
     };
 
-    // Check immediately and then every 15 seconds
+    // Check once for the current state, then rely on the server to push changes
     checkForInterventions();
-    const interval = setInterval(checkForInterventions, 15000);
-    
-    return () => clearInterval(interval);
+
+    const events = new EventSource(`${BACKEND_URL}/events`);
+    events.addEventListener('intervention', (event) => {
+      const data = JSON.parse(event.data);
+      setIntervention(data.intervention_required ? data.intervention_data : null);
+    });
+    events.addEventListener('usage', (event) => {
+      setUsageStats(JSON.parse(event.data));
+    });
+    events.onerror = (error) => {
+      // EventSource reconnects on its own
+      console.error("Event stream error", error);
+    };
+
+    return () => events.close();
   }, [BACKEND_URL]);
 
   const dismissIntervention = () => {
@@ -34,10 +47,10 @@ export function InterventionProvider({ children }) {
   };
 
   return (
-    <InterventionContext.Provider value={{ intervention, dismissIntervention }}>
+    <InterventionContext.Provider value={{ intervention, dismissIntervention, usageStats }}>
       {children}
     </InterventionContext.Provider>
   );
 }
 
-export const useIntervention = () => useContext(InterventionContext);
\ No newline at end of file
+export const useIntervention = () => useContext(InterventionContext);
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { useIntervention } from '../context/InterventionContext';
 import { Bar, Doughnut, Line } from 'react-chartjs-2';
 import {
   Chart as ChartJS,
@@ -30,6 +31,7 @@ ChartJS.register(
     const [stats, setStats] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const { usageStats } = useIntervention();
   
     const BACKEND_URL = 'http://localhost:8000';
   
@@ -46,12 +48,17 @@ ChartJS.register(
         }
       };
   
+      // Load once; later updates are pushed over the event stream
       fetchStats();
-      // Poll for updates every 30 seconds
-      const interval = setInterval(fetchStats, 30000);
-      return () => clearInterval(interval);
     }, [BACKEND_URL]);
   
+    // Apply usage updates pushed by the server
+    useEffect(() => {
+      if (usageStats) {
+        setStats(usageStats);
+      }
+    }, [usageStats]);
+  
     // Prepare chart data if stats are available
     const preparePlatformData = () => {
       if (!stats || !stats.platforms) return null;